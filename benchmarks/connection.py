@@ -0,0 +1,83 @@
+"""Compares write throughput of a plain sqlite3 connection against the tuned one from db.get_connection.
+
+Each game is recorded and committed on its own, the way 'scores record' does it, and then every score is
+updated and committed in batches, the way 'scores recalc' does it.
+
+    python -m benchmarks.connection --games 500
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from gametournament import db
+from gametournament.models import Tournament
+from gametournament.point_scorer import PointScorer
+
+
+def run(path: Path, tuned: bool, games: int, players: int, update_batch: int) -> dict[str, float]:
+    rng = random.Random(0)
+    connection = db.get_connection(path, tuned=tuned)
+    try:
+        db.create_tables(connection)
+        tournament = db.create_tournament(connection, Tournament(
+            name="Connection benchmark",
+            start_date=datetime.now(),
+            rank_multiplier=2.0,
+            duration_multiplier=1.5,
+            apply_bonus_or_penalty=True,
+        ))
+        db.insert_players(connection, tournament['id'], [f"Player {i}" for i in range(players)])
+        all_players = db.get_players(connection, tournament['id'])
+        connection.commit()
+
+        scorer = PointScorer(tournament, all_players, 1)
+        game_scores = [
+            list(scorer.score_raw([(player['id'], rng.randint(0, 100) + i) for i, player in enumerate(all_players)]).values())
+            for _ in range(games)
+        ]
+
+        start = time.perf_counter()
+        for scores in game_scores:
+            db.record_scores(connection, tournament['id'], "Catan", 1, scores)
+            connection.commit()
+        record_seconds = time.perf_counter() - start
+
+        records = db.get_all_records(connection, tournament['id'])
+        updates = [dict(score_id=record['score_id'], tournament_score=record['score'] + 1) for record in records]
+        start = time.perf_counter()
+        for i in range(0, len(updates), update_batch):
+            db.update_scores(connection, updates[i:i + update_batch])
+            connection.commit()
+        update_seconds = time.perf_counter() - start
+    finally:
+        connection.close()
+
+    return {
+        "record_scores_games_per_second": games / record_seconds,
+        "update_scores_rows_per_second": len(updates) / update_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--update-batch", type=int, default=100, help="Scores updated per transaction")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, tuned in (("default", False), ("tuned", True)):
+            results[name] = run(Path(directory) / f"{name}.db", tuned, args.games, args.players, args.update_batch)
+
+    for metric in results["default"]:
+        results.setdefault("speedup", {})[metric] = results["tuned"][metric] / results["default"][metric]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
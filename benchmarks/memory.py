@@ -0,0 +1,82 @@
+"""Compares the peak memory of holding a tournament's scores as one TourneyScore dict per score, which is
+how recalc used to load them, against a columnar ScoreBatch.
+
+    python -m benchmarks.memory --games 2500 --players-per-game 40   # ~100k scores
+"""
+import argparse
+import json
+import sqlite3
+import tempfile
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.synthetic import generate_tournament
+from gametournament import db
+from gametournament.batch_scorer import BatchScorer
+from gametournament.models import Tournament, TourneyScore
+
+
+def peak_memory(func: Callable[[], object]) -> dict[str, float]:
+    """Runs func, returning the peak and retained memory (in MB) of what it allocated."""
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"peak_mb": peak / 2 ** 20, "retained_mb": retained / 2 ** 20}
+
+
+def load_dicts(connection: sqlite3.Connection, tournament: Tournament) -> dict[int, list[TourneyScore]]:
+    records = db.get_all_records(connection, tournament['id'])
+    scores_by_session = defaultdict(list)
+    for record in records:
+        scores_by_session[record['session_id']].append(TourneyScore(
+            player_id=record['player_id'],
+            game_score=record['points_or_rank'],
+            tournament_score=record['score'],
+            game_score_type=record['game_score_type'],
+            score_id=record['score_id'],
+        ))
+    return scores_by_session
+
+
+def recalc_batch(connection: sqlite3.Connection, tournament: Tournament):
+    batch = db.get_score_batch(connection, tournament['id'])
+    return BatchScorer(tournament).recalculate(batch, db.get_sessions(connection, tournament['id']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--games", type=int, default=2_500)
+    parser.add_argument("--players-per-game", type=int, default=40)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        with db.get_connection(Path(directory) / "memory.db") as connection:
+            db.create_tables(connection)
+            tournament = generate_tournament(
+                connection,
+                players=args.players,
+                games=args.games,
+                min_players_per_game=args.players_per_game,
+                max_players_per_game=args.players_per_game,
+            )
+            connection.commit()
+            results = {
+                "score_rows": len(db.get_score_batch(connection, tournament['id'])),
+                "dicts": peak_memory(lambda: load_dicts(connection, tournament)),
+                "score_batch": peak_memory(lambda: db.get_score_batch(connection, tournament['id'])),
+                "score_batch_recalc": peak_memory(lambda: recalc_batch(connection, tournament)),
+            }
+        connection.close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Times the scoring and database hot paths on synthetic tournaments of increasing size.
+
+Results are written as JSON so that runs can be compared:
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --scales small medium --repeat 5
+"""
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.synthetic import generate_tournament
+from gametournament import db
+from gametournament.batch_scorer import BatchScorer
+from gametournament.models import Player, Tournament
+from gametournament.point_scorer import PointScorer
+from gametournament.rank_scorer import RankScorer
+
+# name -> (players, games, players per game)
+SCALES = {
+    "small": (10, 100, 10),
+    "medium": (50, 2_000, 20),
+    "large": (200, 10_000, 40),
+}
+
+
+def time_it(func: Callable[[], object], repeat: int) -> dict[str, float]:
+    """Runs func repeat times, returning the min/median/max wall time in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": min(timings), "median_ms": statistics.median(timings), "max_ms": max(timings)}
+
+
+def full_recalc(connection: sqlite3.Connection, tournament: Tournament):
+    """Everything 'scores recalc' does, minus the prompts and printing. Rolled back so it can be repeated."""
+    batch = db.get_score_batch(connection, tournament['id'])
+    new_scores = BatchScorer(tournament).recalculate(batch, db.get_sessions(connection, tournament['id']))
+    db.update_scores(connection, new_scores)
+    db.get_scores(connection, tournament['id'])
+    connection.rollback()
+
+
+def run_scale(name: str, players: int, games: int, players_per_game: int, repeat: int, directory: Path) -> dict:
+    rng = random.Random(0)
+    with db.get_connection(directory / f"{name}.db") as connection:
+        db.create_tables(connection)
+        start = time.perf_counter()
+        tournament = generate_tournament(
+            connection,
+            players=players,
+            games=games,
+            min_players_per_game=players_per_game,
+            max_players_per_game=players_per_game,
+        )
+        generate_ms = (time.perf_counter() - start) * 1000
+
+        game_players = [Player(id=i, name=f"Player {i}") for i in range(players_per_game)]
+        point_scores = sorted(((i, rng.randint(0, 100)) for i in range(players_per_game)), key=lambda s: s[1], reverse=True)
+        inverse_ranks = [(i, rng.randint(1, players_per_game)) for i in range(players_per_game)]
+        point_scorer = PointScorer(tournament, game_players, 2)
+        rank_scorer = RankScorer(tournament, game_players, 2)
+        all_scores = [score for _, score in point_scores]
+
+        records = db.get_all_records(connection, tournament['id'])
+        # Flip every metascore so the update really writes every row; rolled back after each run
+        flipped = [dict(score_id=record['score_id'], tournament_score=-record['score']) for record in records]
+
+        def update_all():
+            db.update_scores(connection, flipped)
+            connection.rollback()
+
+        def rebuild_ratings():
+            db.rebuild_ratings(connection, tournament['id'])
+            connection.rollback()
+
+        timings = {
+            "PointScorer.calculate": time_it(lambda: point_scorer.calculate(point_scores), repeat),
+            "RankScorer.normalize_ranks": time_it(lambda: rank_scorer.normalize_ranks(inverse_ranks), repeat),
+            "Formula.compute": time_it(lambda: point_scorer.formula.compute(1, all_scores, all_scores[0]), repeat),
+            "db.get_scores": time_it(lambda: db.get_scores(connection, tournament['id']), repeat),
+            "db.get_all_records": time_it(lambda: db.get_all_records(connection, tournament['id']), repeat),
+            "db.get_score_batch": time_it(lambda: db.get_score_batch(connection, tournament['id']), repeat),
+            "db.update_scores": time_it(update_all, repeat),
+            "db.rebuild_ratings": time_it(rebuild_ratings, repeat),
+            "recalc": time_it(lambda: full_recalc(connection, tournament), repeat),
+        }
+
+    return {
+        "players": players,
+        "games": games,
+        "players_per_game": players_per_game,
+        "score_rows": len(records),
+        "generate_ms": generate_ms,
+        "timings": timings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", choices=SCALES.keys(), default=list(SCALES.keys()))
+    parser.add_argument("--repeat", type=int, default=3, help="Number of times to run each benchmark")
+    parser.add_argument("--output", type=Path, default=None, help="File to write the JSON results to (default: stdout)")
+    args = parser.parse_args()
+
+    results = {
+        "started_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.scales:
+            print(f"Running {name}...", file=sys.stderr)
+            results["scales"][name] = run_scale(name, *SCALES[name], args.repeat, Path(directory))
+
+    as_json = json.dumps(results, indent=2)
+    if args.output is None:
+        print(as_json)
+    else:
+        args.output.write_text(as_json)
+
+
+if __name__ == '__main__':
+    main()
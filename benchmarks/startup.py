@@ -0,0 +1,108 @@
+"""Checks that `game-tournament --help` and a tab completion stay within their import budgets.
+
+Runs the CLI (and then the completion entry point) several times, each in a fresh interpreter with
+`-X importtime`, and fails (exit code 1) if the median total import time goes over the budget, or if any
+module that should only be imported by a subcommand is imported just to show the help or answer the
+completion. Import times swing a lot from run to run and machine to machine, so the budgets leave room
+for that; the deferred module checks are what catch an accidental heavy import.
+
+    python benchmarks/startup.py --budget-ms 120 --completion-budget-ms 40
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+
+# These should only ever be imported once a subcommand that needs them is running
+DEFERRED_MODULES = [
+    "yaml",
+    "numpy",
+    "sqlite3",
+    "gametournament.db",
+    "gametournament.commands",
+    "gametournament.point_scorer",
+    "gametournament.rank_scorer",
+    "gametournament.batch_scorer",
+]
+# Completion answers from its cache file, so it shouldn't even need click
+COMPLETION_DEFERRED_MODULES = [*DEFERRED_MODULES, "click", "pathlib"]
+COMPLETION_ENV = {
+    "COMP_WORDS": "game-tournament tournament select ",
+    "COMP_CWORD": "3",
+    "_GAME_TOURNAMENT_COMPLETE": "bash_complete",
+}
+
+
+def measure(args: list[str], env: dict[str, str] = None) -> tuple[float, float, dict[str, int]]:
+    """Runs python with the given args, returning (wall ms, total import ms, self import µs by module)."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=REPO_ROOT,
+        env=None if env is None else {**os.environ, **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, module = line.removeprefix("import time:").split("|")
+        imports[module.strip()] = int(self_us)
+    return wall_ms, sum(imports.values()) / 1000, imports
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=120, help="Maximum median total import time, in milliseconds")
+    parser.add_argument(
+        "--completion-budget-ms",
+        type=float,
+        default=40,
+        help="Maximum median total import time of a tab completion, in milliseconds",
+    )
+    parser.add_argument("--runs", type=int, default=9, help="Number of runs; the median one is checked")
+    parser.add_argument("--top", type=int, default=10, help="How many of the slowest imports to show")
+    args = parser.parse_args()
+
+    failures = []
+    checks = [
+        ("game-tournament --help", [str(REPO_ROOT / "main.py"), "--help"], None, args.budget_ms, DEFERRED_MODULES),
+        # The first run writes the completion cache if it's missing, which is slow, but it's only one of the runs
+        (
+            "tab completion",
+            ["-m", "gametournament.completion"],
+            COMPLETION_ENV,
+            args.completion_budget_ms,
+            COMPLETION_DEFERRED_MODULES,
+        ),
+    ]
+    for name, command, env, budget_ms, deferred_modules in checks:
+        runs = sorted((measure(command, env) for _ in range(args.runs)), key=lambda run: run[1])
+        wall_ms, import_ms, imports = runs[len(runs) // 2]
+
+        print(f"{name}: {wall_ms:.1f}ms wall, {import_ms:.1f}ms importing ({len(imports)} modules; median of {len(runs)} runs)")
+        print("Slowest imports:")
+        for module, self_us in sorted(imports.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"  {self_us / 1000:>7.2f}ms  {module}")
+
+        if import_ms > budget_ms:
+            failures.append(f"{name}: import time of {import_ms:.1f}ms is over the budget of {budget_ms}ms")
+        for module in deferred_modules:
+            if module in imports:
+                failures.append(f"{name}: {module} was imported")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
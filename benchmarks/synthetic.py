@@ -0,0 +1,106 @@
+"""Builds synthetic tournaments of any size, recording every game through the db module.
+
+    python -m benchmarks.synthetic tournament.db --players 50 --games 2000
+"""
+import argparse
+import random
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from gametournament import db
+from gametournament.models import Tournament
+from gametournament.point_scorer import PointScorer
+from gametournament.rank_scorer import RankScorer
+
+GAME_NAMES = ["Catan", "Azul", "Wingspan", "Codenames", "Ticket to Ride", "Carcassonne", "Terraforming Mars", "Trivia"]
+GAME_HOURS = [0.5, 1, 1.5, 2, 3]
+
+
+def generate_tournament(
+    connection: sqlite3.Connection,
+    players: int = 20,
+    games: int = 200,
+    rank_fraction: float = 0.3,
+    tie_rate: float = 0.1,
+    min_players_per_game: int = 3,
+    max_players_per_game: int = None,
+    bonus: bool = True,
+    seed: int = 0,
+) -> Tournament:
+    """Creates a tournament with the given number of players and records the given number of games for it.
+
+    Each game has a random subset of the players, is rank-based with probability rank_fraction, and each
+    player ties the previous one with probability tie_rate.
+    """
+    rng = random.Random(seed)
+    tournament = db.create_tournament(connection, Tournament(
+        name=f"Synthetic {players}x{games}",
+        start_date=datetime.now(),
+        rank_multiplier=2.0,
+        duration_multiplier=1.5,
+        apply_bonus_or_penalty=bonus,
+    ))
+    db.insert_players(connection, tournament['id'], [f"Player {i}" for i in range(players)])
+    all_players = db.get_players(connection, tournament['id'])
+    max_players_per_game = min(max_players_per_game or players, players)
+    min_players_per_game = min(min_players_per_game, max_players_per_game)
+
+    for game_number in range(games):
+        game_players = rng.sample(all_players, rng.randint(min_players_per_game, max_players_per_game))
+        hours = rng.choice(GAME_HOURS)
+        if rng.random() < rank_fraction:
+            scorer = RankScorer(tournament, game_players, hours)
+            raw_scores = _raw_results(rng, game_players, tie_rate, lambda: rng.randint(1, len(game_players)))
+        else:
+            scorer = PointScorer(tournament, game_players, hours)
+            raw_scores = _raw_results(rng, game_players, tie_rate, lambda: rng.randint(0, 100))
+
+        scores = scorer.score_raw(raw_scores)
+        db.record_scores(connection, tournament['id'], rng.choice(GAME_NAMES), hours, scores.values())
+
+    connection.commit()
+    return tournament
+
+
+def _raw_results(rng: random.Random, players: list, tie_rate: float, make_score) -> list[tuple[int, int]]:
+    results = []
+    for player in players:
+        if results and rng.random() < tie_rate:
+            results.append((player['id'], results[-1][1]))
+        else:
+            results.append((player['id'], make_score()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database", type=Path, help="Database file to create (it's replaced if it exists)")
+    parser.add_argument("--players", type=int, default=20)
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--rank-fraction", type=float, default=0.3, help="Fraction of the games that are rank-based")
+    parser.add_argument("--tie-rate", type=float, default=0.1, help="Chance of each player tying the previous one")
+    parser.add_argument("--min-players-per-game", type=int, default=3)
+    parser.add_argument("--max-players-per-game", type=int, default=None)
+    parser.add_argument("--no-bonus", action="store_true", help="Don't apply the standard deviation bonus")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with db.get_connection(args.database) as connection:
+        db.create_tables(connection)
+        tournament = generate_tournament(
+            connection,
+            players=args.players,
+            games=args.games,
+            rank_fraction=args.rank_fraction,
+            tie_rate=args.tie_rate,
+            min_players_per_game=args.min_players_per_game,
+            max_players_per_game=args.max_players_per_game,
+            bonus=not args.no_bonus,
+            seed=args.seed,
+        )
+    print(f"Created tournament {tournament['id']} ({tournament['name']}) in {args.database}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,8 @@ _game_tournament_completion() {
     local IFS=$'\n'
     local response
 
-    response=$(env COMP_WORDS="${COMP_WORDS[*]}" COMP_CWORD=$COMP_CWORD _GAME_TOURNAMENT_COMPLETE=bash_complete $1)
+    # game-tournament-complete answers from a cache, without loading the whole app (see gametournament/completion.py)
+    response=$(env COMP_WORDS="${COMP_WORDS[*]}" COMP_CWORD=$COMP_CWORD _GAME_TOURNAMENT_COMPLETE=bash_complete game-tournament-complete)
 
     for completion in $response; do
         IFS=',' read type value <<< "$completion"
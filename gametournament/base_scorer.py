@@ -1,10 +1,5 @@
 from __future__ import annotations
-import statistics
 from abc import ABC, abstractmethod
-from typing import Self
-
-from jedi.inference.gradual.typing import Callable
-from pygments.token import Other
 
 from gametournament.formula import Formula
 from gametournament.models import TourneyScore, Player, Tournament
@@ -19,10 +14,15 @@ class BaseScorer(ABC):
     @abstractmethod
     def score(self) -> dict[int, TourneyScore]: ...
 
+    @abstractmethod
+    def score_raw(self, raw_scores: list[tuple[int, float]]) -> dict[int, TourneyScore]:
+        """Implement this to calculate the metascores from (player id, raw game result) pairs, in any order"""
+
     @abstractmethod
     def calculate(self, scores: list[tuple[int, float]]) -> dict[int, TourneyScore]: ...
 
     def recalculate(self, scores: list[TourneyScore]):
+        """Recalculates the metascores of one game's scores in place, returning them"""
         scores_to_calc_with = [(t['player_id'], t['game_score']) for t in scores]
         result = self.calculate(scores_to_calc_with)
         for score in scores:
@@ -0,0 +1,120 @@
+import sqlite3
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+from gametournament.models import Tournament
+from gametournament.point_scorer import PointFormula
+from gametournament.rank_scorer import RankFormula
+from gametournament.score_batch import ScoreBatch
+
+
+class FormulaInputs(NamedTuple):
+    """The formula variables of a batch of scores, one entry per score."""
+    hours: np.ndarray
+    points: np.ndarray
+    inverse_ranks: np.ndarray
+    std_devs: np.ndarray
+
+
+class BatchScorer:
+    """Recalculates the metascores of every game in a tournament at once.
+
+    This produces the same metascores as running each game through a PointScorer or RankScorer, but
+    computes the inverse ranks, ties and mean/stdev bonuses for all the games with grouped numpy
+    operations and evaluates the compiled formulae over whole columns.
+    """
+    def __init__(self, tournament: Tournament):
+        self.tournament = tournament
+
+    def recalculate(self, batch: ScoreBatch, sessions: Sequence[sqlite3.Row]) -> ScoreBatch:
+        """Recalculates the scores in the batch, returning a copy of it with the new metascores.
+
+        sessions are the game sessions of the batch's scores (from db.get_sessions).
+        """
+        return batch.with_tournament_scores(self.compute_metascores(batch, sessions))
+
+    def compute_metascores(self, batch: ScoreBatch, sessions: Sequence[sqlite3.Row]) -> np.ndarray:
+        return self.evaluate(self.formula_inputs(batch, sessions))
+
+    def formula_inputs(self, batch: ScoreBatch, sessions: Sequence[sqlite3.Row]) -> FormulaInputs:
+        """Works out the formula variables of every score. These don't depend on the tournament's settings."""
+        session_ids = np.array([session['id'] for session in sessions], dtype=np.int64)
+        session_hours = np.array([session['hours'] for session in sessions], dtype=np.float64)
+        session_is_points = np.array([session['score_type'] == 'points' for session in sessions], dtype=bool)
+
+        # The columns are viewed in place rather than copied
+        game_scores = np.frombuffer(batch.game_scores, dtype=np.float64)
+        session_index = np.searchsorted(session_ids, np.frombuffer(batch.session_ids, dtype=np.int64))
+        points = session_is_points[session_index]
+
+        # Rank games already store their normalized inverse rank as the game score
+        inverse_ranks = game_scores.copy()
+        std_devs = np.zeros(len(batch), dtype=np.float64)
+        if points.any():
+            inverse_ranks[points], std_devs[points] = self._point_values(
+                session_index[points],
+                len(session_ids),
+                game_scores[points],
+            )
+        return FormulaInputs(session_hours[session_index], points, inverse_ranks, std_devs)
+
+    def evaluate(self, inputs: FormulaInputs) -> np.ndarray:
+        """Evaluates the compiled formulae over every score.
+
+        The tournament's multipliers can also be arrays, to evaluate many settings at once; e.g. with
+        multipliers of shape (n, 1), this returns an (n, scores) array with a row per setting.
+        """
+        shape = np.broadcast_shapes(
+            np.shape(self.tournament['rank_multiplier']),
+            np.shape(self.tournament['duration_multiplier']),
+            inputs.hours.shape,
+        )
+        metascores = np.empty(shape, dtype=np.float64)
+        points = inputs.points
+        ranks = ~points
+
+        if ranks.any():
+            formula = RankFormula(self.tournament, inputs.hours[ranks])
+            metascores[..., ranks] = formula.compile()(inputs.inverse_ranks[ranks])
+
+        if points.any():
+            formula = PointFormula(self.tournament, inputs.hours[points])
+            metascores[..., points] = formula.compile()(inputs.inverse_ranks[points], inputs.std_devs[points])
+
+        return metascores
+
+    @staticmethod
+    def _point_values(
+        session_index: np.ndarray,
+        session_count: int,
+        points: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Gets the inverse rank and +/- standard deviations from the mean for every point-game score."""
+        counts = np.bincount(session_index, minlength=session_count)
+
+        # Sort by session, then by points descending, so that tied players are next to each other and the
+        # number of players with more points is the offset of the first tied player from the session start.
+        order = np.lexsort((-points, session_index))
+        sorted_sessions = session_index[order]
+        sorted_points = points[order]
+        positions = np.arange(len(order))
+        new_session = np.ones(len(order), dtype=bool)
+        new_session[1:] = sorted_sessions[1:] != sorted_sessions[:-1]
+        new_points = new_session.copy()
+        new_points[1:] |= sorted_points[1:] != sorted_points[:-1]
+        session_starts = np.maximum.accumulate(np.where(new_session, positions, 0))
+        tie_starts = np.maximum.accumulate(np.where(new_points, positions, 0))
+
+        inverse_ranks = np.empty(len(order), dtype=np.float64)
+        inverse_ranks[order] = counts[sorted_sessions] - (tie_starts - session_starts)
+
+        # As with GameStats, a single player or an all-way tie has no spread, so gets no bonus or penalty
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.bincount(session_index, weights=points, minlength=session_count) / counts
+            dist_from_mean = points - means[session_index]
+            variances = np.bincount(session_index, weights=dist_from_mean ** 2, minlength=session_count) / (counts - 1)
+            std = np.sqrt(np.where(counts > 1, variances, 0))[session_index]
+            std_devs = np.where(std > 0, dist_from_mean / std, 0.0)
+
+        return inverse_ranks, std_devs
@@ -0,0 +1,64 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+from gametournament import db
+from gametournament.models import Player
+
+
+class LRUCache[V]:
+    """A thread-safe least-recently-used cache that counts its hits and misses."""
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, V] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], V]) -> V:
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        # Computed outside the lock so a slow query doesn't hold up hits for other keys
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "max_size": self.max_size}
+
+
+class StandingsCache:
+    """Caches db.get_scores and db.get_all_records, keyed on the tournament id and its revision.
+
+    The revision is bumped whenever a tournament's players or scores change, so reading it is a single
+    primary key lookup, and as long as nothing changes the scores table is never read again. Only use this
+    with committed data: an uncommitted write that gets rolled back would reuse the revision it bumped to.
+    """
+    def __init__(self, max_size: int = 64):
+        self.cache = LRUCache(max_size)
+
+    def get_scores(self, connection: sqlite3.Connection, tournament_id: int) -> list[tuple[Player, float, int, float]]:
+        return self._get("scores", db.get_scores, connection, tournament_id)
+
+    def get_all_records(self, connection: sqlite3.Connection, tournament_id: int) -> list[sqlite3.Row]:
+        return self._get("records", db.get_all_records, connection, tournament_id)
+
+    def stats(self) -> dict[str, int]:
+        return self.cache.stats()
+
+    def _get(self, kind: str, query: Callable, connection: sqlite3.Connection, tournament_id: int):
+        # The revision has to be read before the data. If a write lands in between, the newer data is
+        # cached under the older revision, which is harmless; the other way around would cache stale data.
+        revision = db.get_revision(connection, tournament_id)
+        return self.cache.get_or_compute((kind, tournament_id, revision), lambda: query(connection, tournament_id))
@@ -0,0 +1,221 @@
+"""Exports tournaments to, and imports them from, a directory of column files for analytics.
+
+A bundle holds a meta.json (the tournament's settings, its players and the names of its games) and the
+columns of its game sessions and scores, either as .npy files, which can be memory-mapped by NumPy, or
+(if pyarrow is installed) as sessions.parquet and scores.parquet. Game names are stored as codes into
+the list of names in meta.json.
+
+Both directions go chunk by chunk: the export writes straight from the db cursors into the column
+files, and the import bulk inserts slices of the (memory-mapped) columns, remapping the ids as it goes.
+"""
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Literal
+
+import numpy as np
+
+from gametournament import db
+from gametournament.models import Tournament
+
+FORMAT_VERSION = 1
+CHUNK_SIZE = 50_000
+
+type BundleFormat = Literal['npy', 'parquet']
+
+SESSION_COLUMNS = {
+    "id": np.int64,
+    "game": np.int32,
+    "hours": np.float64,
+    "is_points": np.bool_,
+    "recorded_at": "datetime64[us]",
+}
+SCORE_COLUMNS = {
+    "session_id": np.int64,
+    "player_id": np.int64,
+    "points_or_rank": np.float64,
+    "score": np.float64,
+}
+
+
+class BundleError(ValueError):
+    """Raised when a directory isn't a bundle that can be imported"""
+
+
+class NpyWriter:
+    """Writes each column to its own .npy file, which has to be sized up front."""
+    def __init__(self, directory: Path, table: str, columns: dict[str, np.dtype], rows: int):
+        self.offset = 0
+        self.arrays = {
+            name: np.lib.format.open_memmap(directory / f"{table}.{name}.npy", mode="w+", dtype=dtype, shape=(rows,))
+            for name, dtype in columns.items()
+        }
+
+    def write(self, chunk: dict[str, np.ndarray]):
+        rows = len(next(iter(chunk.values())))
+        for name, array in self.arrays.items():
+            array[self.offset:self.offset + rows] = chunk[name]
+        self.offset += rows
+
+    def close(self):
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays.clear()
+
+
+class ParquetWriter:
+    def __init__(self, directory: Path, table: str, columns: dict[str, np.dtype]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([(name, pa.from_numpy_dtype(np.dtype(dtype))) for name, dtype in columns.items()])
+        self.writer = pq.ParquetWriter(directory / f"{table}.parquet", self.schema)
+
+    def write(self, chunk: dict[str, np.ndarray]):
+        self.writer.write_batch(self.pa.record_batch([chunk[name] for name in self.schema.names], schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def export_tournament(
+    connection: sqlite3.Connection,
+    tournament: Tournament,
+    directory: Path,
+    bundle_format: BundleFormat = 'npy',
+) -> tuple[int, int]:
+    """Writes the tournament to a bundle in directory, returning the number of (sessions, scores) written."""
+    if bundle_format == 'parquet':
+        _require_pyarrow()
+    directory.mkdir(parents=True, exist_ok=True)
+    session_count, score_count = db.get_row_counts(connection, tournament['id'])
+
+    sessions_writer: NpyWriter | ParquetWriter
+    scores_writer: NpyWriter | ParquetWriter
+    if bundle_format == 'npy':
+        sessions_writer = NpyWriter(directory, "sessions", SESSION_COLUMNS, session_count)
+        scores_writer = NpyWriter(directory, "scores", SCORE_COLUMNS, score_count)
+    else:
+        sessions_writer = ParquetWriter(directory, "sessions", SESSION_COLUMNS)
+        scores_writer = ParquetWriter(directory, "scores", SCORE_COLUMNS)
+
+    game_codes: dict[str, int] = {}
+    for rows in db.iter_session_chunks(connection, tournament['id'], CHUNK_SIZE):
+        ids, games, hours, score_types, recorded_at = zip(*rows)
+        sessions_writer.write({
+            "id": np.array(ids, dtype=np.int64),
+            "game": np.array([game_codes.setdefault(game, len(game_codes)) for game in games], dtype=np.int32),
+            "hours": np.array(hours, dtype=np.float64),
+            "is_points": np.array(score_types) == 'points',
+            "recorded_at": np.array(recorded_at, dtype="datetime64[us]"),
+        })
+    sessions_writer.close()
+
+    for rows in db.iter_score_chunks(connection, tournament['id'], CHUNK_SIZE):
+        columns = np.array(rows, dtype=np.float64)
+        scores_writer.write({
+            "session_id": columns[:, 1].astype(np.int64),
+            "player_id": columns[:, 2].astype(np.int64),
+            "points_or_rank": columns[:, 3],
+            "score": columns[:, 4],
+        })
+    scores_writer.close()
+
+    players = sorted(db.get_players(connection, tournament['id']), key=lambda player: player['id'])
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "format": bundle_format,
+        "tournament": {
+            "name": tournament['name'],
+            "start_date": str(tournament['start_date']),
+            "rank_multiplier": tournament['rank_multiplier'],
+            "duration_multiplier": tournament['duration_multiplier'],
+            "apply_bonus_or_penalty": bool(tournament['apply_bonus_or_penalty']),
+        },
+        "players": [{"id": player['id'], "name": player['name']} for player in players],
+        "games": list(game_codes),
+        "sessions": session_count,
+        "scores": score_count,
+    }
+    (directory / "meta.json").write_text(json.dumps(meta, indent=2))
+    return session_count, score_count
+
+
+def import_tournament(connection: sqlite3.Connection, directory: Path, name: str = None) -> tuple[Tournament, int, int]:
+    """Creates a new tournament from a bundle, returning it with the number of (sessions, scores) imported.
+
+    The sessions and players get new ids. Nothing is committed; do that once this returns.
+    """
+    try:
+        meta = json.loads((directory / "meta.json").read_text())
+    except (OSError, json.JSONDecodeError) as e:
+        raise BundleError(f"{directory} doesn't have a readable meta.json: {e}") from e
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise BundleError(f"{directory} has format version {meta.get('format_version')}; expected {FORMAT_VERSION}")
+
+    tournament = db.create_tournament(connection, Tournament(meta["tournament"], name=name or meta["tournament"]["name"]))
+    old_player_ids = np.array([player['id'] for player in meta["players"]], dtype=np.int64)
+    db.insert_players(connection, tournament['id'], [player['name'] for player in meta["players"]])
+    # The players were just inserted in the same order as their old ids, so the new ids line up
+    new_player_ids = np.array(
+        sorted(player['id'] for player in db.get_players(connection, tournament['id'])),
+        dtype=np.int64,
+    )
+
+    games = np.array(meta["games"], dtype=object)
+    first_session_id = db.get_next_session_id(connection)
+    old_first_session_id = None
+    session_count = score_count = 0
+    for chunk in _read_chunks(directory, "sessions", SESSION_COLUMNS, meta["format"]):
+        if old_first_session_id is None:
+            old_first_session_id = int(chunk["id"][0])
+        recorded_at = chunk["recorded_at"].astype(datetime)
+        db.bulk_insert_sessions(connection, tournament['id'], zip(
+            (chunk["id"] - old_first_session_id + first_session_id).tolist(),
+            games[chunk["game"]].tolist(),
+            chunk["hours"].tolist(),
+            np.where(chunk["is_points"], 'points', 'rank').tolist(),
+            [time.isoformat() for time in recorded_at],
+        ))
+        session_count += len(chunk["id"])
+
+    for chunk in _read_chunks(directory, "scores", SCORE_COLUMNS, meta["format"]):
+        db.bulk_insert_scores(connection, tournament['id'], zip(
+            (chunk["session_id"] - old_first_session_id + first_session_id).tolist(),
+            new_player_ids[np.searchsorted(old_player_ids, chunk["player_id"])].tolist(),
+            chunk["points_or_rank"].tolist(),
+            chunk["score"].tolist(),
+        ))
+        score_count += len(chunk["session_id"])
+
+    db.rebuild_standings(connection, tournament['id'])
+    db.add_to_careers(connection, tournament['id'])
+    db.rebuild_ratings(connection, tournament['id'])
+    return tournament, session_count, score_count
+
+
+def _read_chunks(directory: Path, table: str, columns: dict[str, np.dtype], bundle_format: BundleFormat) -> Iterator[dict[str, np.ndarray]]:
+    if bundle_format == 'parquet':
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(directory / f"{table}.parquet").iter_batches(batch_size=CHUNK_SIZE):
+            yield {name: batch.column(name).to_numpy(zero_copy_only=False) for name in columns}
+        return
+
+    try:
+        arrays = {name: np.load(directory / f"{table}.{name}.npy", mmap_mode="r") for name in columns}
+    except OSError as e:
+        raise BundleError(f"{directory} is missing a {table} column: {e}") from e
+    rows = len(next(iter(arrays.values())))
+    for start in range(0, rows, CHUNK_SIZE):
+        yield {name: array[start:start + CHUNK_SIZE] for name, array in arrays.items()}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise BundleError("The parquet format needs pyarrow; install it with the parquet extra") from None
@@ -0,0 +1,141 @@
+"""The subcommands of the CLI. Each module here is only imported when one of its commands is run, so
+anything slow to import should be imported inside the command functions rather than at module level.
+"""
+import functools
+import sqlite3
+from typing import Callable, Concatenate, Iterable
+
+import click
+from click.shell_completion import CompletionItem
+
+from gametournament import completion, db, tournament_tools
+from gametournament.models import Tournament, TourneyScore
+
+
+def require_dbfile[**P, R](func: Callable[Concatenate[sqlite3.Connection, P], R]) -> Callable[P, R]:
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        if not db.DB_FILE.exists():
+            raise click.Abort("You need to run the init command!")
+        with db.get_connection() as connection:
+            return func(connection, *args,  **kwargs)
+    return wrapper
+
+def require_current_tournament[**P, R](func: Callable[Concatenate[Tournament, P], R]) -> Callable[P, R]:
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        tournament = tournament_tools.get_current_tournament()
+        if tournament is None:
+            raise click.Abort("No currently selected tournament")
+        return func(tournament, *args, **kwargs)
+    return wrapper
+
+
+def get_stored_current_tournament(connection: sqlite3.Connection) -> Tournament:
+    """Gets the current tournament as it's stored in the db, rather than the copy in the context file, whose
+    settings can be out of date. Use this wherever the settings decide the metascores.
+    """
+    current_tournament = tournament_tools.get_current_tournament()
+    if current_tournament is None:
+        raise click.Abort("No currently selected tournament")
+    tournament = db.get_tournament(connection, current_tournament['id'])
+    if tournament is None:
+        raise click.ClickException(
+            f"The current tournament (id {current_tournament['id']}) no longer exists; select another one"
+        )
+    return tournament
+
+
+def pretty_print_game_scores(player_lookup: dict[int, str], scores: Iterable[TourneyScore]):
+    pretty_scores = {player_lookup[score['player_id']]: score for score in scores}
+    for key, value in pretty_scores.items():
+        click.echo(f"{key} ->  {value['tournament_score']}")
+
+
+def output_scores(current_totals):
+    click.echo(f"\n{'-' * 20}\nHere are the running total scores:")
+    for player, score, game_count, avg_score in current_totals:
+        click.echo(f'{player["name"]} -> avg: {round(avg_score, 3)}, total: {round(score, 3)}, games: {game_count}')
+
+
+class CachedValue(click.ParamType):
+    """A name whose values are completed from the completion cache (see gametournament.completion) rather
+    than the db. kind is "player" (of the current tournament) or "person" (anyone who has played).
+    """
+    name = "text"
+
+    def __init__(self, kind: str):
+        self.kind = kind
+
+    def shell_complete(self, ctx: click.Context, param: click.Parameter, incomplete: str) -> list[CompletionItem]:
+        cache = completion.load_cache() or {}
+        return [CompletionItem(value, help=help_) for _, value, help_ in completion.cached_values(cache, self.kind, incomplete)]
+
+
+class TournamentId(CachedValue):
+    """A tournament's id, completed from the completion cache with the tournaments' names as help."""
+    name = "integer"
+
+    def __init__(self):
+        super().__init__("tournament")
+
+    def convert(self, value, param: click.Parameter | None, ctx: click.Context | None) -> int:
+        try:
+            return int(value)
+        except ValueError:
+            self.fail(f"{value!r} is not a tournament id", param, ctx)
+
+
+def refresh_completion_cache(connection: sqlite3.Connection | None, root: click.Command = None):
+    """Rewrites the completion cache from the db and the command tree (by default, that of the command
+    being run). Call this after anything that adds tournaments or players, or changes the current one.
+    """
+    if root is None:
+        root = click.get_current_context().find_root().command
+    data = {"commands": describe_command(root, click.Context(root)), "tournaments": [], "players": [], "people": []}
+    if connection is not None:
+        data["tournaments"] = [[tournament['id'], tournament['name']] for tournament in db.get_tournaments(connection)]
+        data["people"] = db.get_people(connection)
+        try:
+            current = tournament_tools.get_current_tournament()
+        except RuntimeError:
+            current = None
+        if current is not None:
+            data["players"] = [player['name'] for player in db.get_players(connection, current['id'])]
+    completion.write_cache(data)
+
+
+def describe_command(command: click.Command, ctx: click.Context) -> dict:
+    """Describes a command's options, arguments and subcommands (recursively) for the completion cache."""
+    options = {}
+    arguments = []
+    for param in command.get_params(ctx):
+        if isinstance(param, click.Option):
+            if param.hidden:
+                continue
+            value = None if param.is_flag or param.count else describe_value(param.type)
+            for name in [*param.opts, *param.secondary_opts]:
+                options[name] = {"help": param.help, "value": value}
+        elif isinstance(param, click.Argument):
+            arguments.append(describe_value(param.type))
+
+    commands = {}
+    if isinstance(command, click.Group):
+        for name in command.list_commands(ctx):
+            subcommand = command.get_command(ctx, name)
+            if subcommand is not None and not subcommand.hidden:
+                commands[name] = describe_command(subcommand, click.Context(subcommand, parent=ctx, info_name=name))
+
+    return {"help": command.get_short_help_str(), "options": options, "arguments": arguments, "commands": commands}
+
+
+def describe_value(param_type: click.ParamType) -> dict:
+    if isinstance(param_type, CachedValue):
+        return {"type": param_type.kind}
+    if isinstance(param_type, click.Choice):
+        return {"type": "choice", "choices": [str(choice) for choice in param_type.choices]}
+    if isinstance(param_type, click.Path) and not param_type.file_okay:
+        return {"type": "dir"}
+    if isinstance(param_type, (click.Path, click.File)):
+        return {"type": "file"}
+    return {"type": "value"}
@@ -0,0 +1,41 @@
+import sqlite3
+
+import click
+
+from gametournament import db
+from gametournament.commands import CachedValue, require_dbfile
+
+
+@click.group(short_help="Commands for players across every tournament")
+def players():
+    pass
+
+
+@players.command(short_help="Shows a player's career across every tournament")
+@click.argument("name", type=CachedValue("person"))
+@require_dbfile
+def stats(connection: sqlite3.Connection, name: str):
+    """Shows NAME's games, wins and metascores for each game, across every tournament they've played in.
+
+    Players with the same name (ignoring case) in different tournaments are the same person. A win is
+    getting the highest metascore in a game (ties all count as wins).
+    """
+    person, careers = db.get_career(connection, name)
+    if person is None:
+        raise click.ClickException(f"Nobody named {name} has played in any tournament")
+
+    games_played = sum(career['games_played'] for career in careers)
+    wins = sum(career['wins'] for career in careers)
+    total = sum(career['total'] for career in careers)
+    click.echo(f"{person['name']}: {games_played} games in {person['tournaments']} tournaments\n")
+    click.echo(f"{'Game':<24}{'Games':>7}{'Wins':>6}{'Win %':>8}{'Total':>10}{'Avg':>9}")
+    for career in careers:
+        click.echo(
+            f"{career['game'][:24]:<24}{career['games_played']:>7}{career['wins']:>6}"
+            f"{career['wins'] / career['games_played']:>8.1%}{career['total']:>10.2f}{career['average']:>9.3f}"
+        )
+    if games_played:
+        click.echo(
+            f"{'All games':<24}{games_played:>7}{wins:>6}{wins / games_played:>8.1%}"
+            f"{total:>10.2f}{total / games_played:>9.3f}"
+        )
@@ -0,0 +1,43 @@
+import sqlite3
+
+import click
+
+from gametournament import db, tournament_tools
+from gametournament.commands import require_dbfile, require_current_tournament
+from gametournament.models import Tournament
+
+
+@click.group(short_help="Skill ratings that account for the strength of opponents")
+def ratings():
+    pass
+
+
+@ratings.command(short_help="Shows the current tournament's skill ratings")
+@require_dbfile
+@require_current_tournament
+def show(tournament: Tournament, connection: sqlite3.Connection):
+    """Shows each player's Elo-style rating. Every game moves the ratings of the players in it, by more for
+    beating (or losing to) players rated higher (or lower) than expected.
+    """
+    for player, rating, game_count in db.get_ratings(connection, tournament['id']):
+        click.echo(f"{player['name']} -> rating: {rating:.0f}, games: {game_count}")
+
+
+@ratings.command(short_help="Recomputes the ratings by replaying every recorded game")
+@click.option("--all", "all_tournaments", is_flag=True, help="Rebuild the ratings of every tournament")
+@require_dbfile
+def rebuild(connection: sqlite3.Connection, all_tournaments: bool):
+    """Replays the current tournament's games (or every tournament's, with --all) in the order they were
+    played. This is only needed after games were imported out of order or the rating settings changed.
+    """
+    if all_tournaments:
+        tournament_id = None
+    else:
+        tournament = tournament_tools.get_current_tournament()
+        if tournament is None:
+            raise click.Abort("No currently selected tournament")
+        tournament_id = tournament['id']
+
+    with connection:
+        db.rebuild_ratings(connection, tournament_id)
+    click.echo("Ratings rebuilt.")
@@ -0,0 +1,364 @@
+import csv
+import heapq
+import itertools
+import json
+import sqlite3
+from datetime import datetime
+from typing import Iterable, Iterator
+
+import click
+
+from gametournament import db
+from gametournament.commands import (
+    get_stored_current_tournament,
+    require_dbfile,
+    require_current_tournament,
+    pretty_print_game_scores,
+    output_scores,
+    refresh_completion_cache,
+)
+from gametournament.models import Tournament
+
+
+@click.group(short_help="Commands for working with scores")
+def scores():
+    pass
+
+@scores.command(short_help="Adds scores for a game")
+@require_dbfile
+@require_current_tournament
+def record(tournament: Tournament, connection: sqlite3.Connection):
+    from gametournament.point_scorer import PointScorer
+    from gametournament.rank_scorer import RankScorer
+
+    all_players = db.get_players(connection, tournament['id'])
+
+    game = click.prompt("What game was it?")
+    hours = click.prompt("How many hours did you play it?", type=float)
+    if click.confirm("Did all players play?", default=True):
+        players = all_players
+    else:
+        players = []
+        for player in all_players:
+            if click.confirm(f"Did {player['name']} play?"):
+                players.append(player)
+    if not players:
+        raise click.UsageError("Nobody played, so there's no game to record")
+
+    if click.confirm("Did the game have points?", default=True):
+        scorer = PointScorer(tournament, players, hours)
+    else:
+        scorer = RankScorer(tournament, players, hours)
+
+    scores = scorer.score()
+    formula = scorer.get_formula()
+
+    click.echo(f"Metascore formula:\n\t{formula}")
+
+    player_lookup = {player['id']: player['name'] for player in players}
+    click.echo(f"\n{'-' * 20}\nHere are the meta-scores for that game:")
+    pretty_print_game_scores(player_lookup, scores.values())
+
+    click.confirm(f"\n{'-' * 20}\nDo you want to record these scores?", default=True, abort=True)
+
+    db.record_scores(connection, tournament['id'], game, hours, scores.values())
+    current_totals = db.get_scores(connection, tournament['id'])
+
+    output_scores(current_totals)
+
+
+@scores.command(short_help="Gets the current rankings/scores for the tournament")
+@click.option(
+    "--as-of",
+    type=click.DateTime(),
+    default=None,
+    help="Get the standings as they were at this time, counting only the games recorded by then",
+)
+@require_dbfile
+@require_current_tournament
+def get(tournament: Tournament, connection: sqlite3.Connection, as_of: datetime | None):
+    if as_of is None:
+        current_totals = db.get_scores(connection, tournament['id'])
+    else:
+        current_totals = db.get_scores_as_of(connection, tournament['id'], as_of)
+    output_scores(current_totals)
+
+
+@scores.command(short_help="Shows the standings after every game, in the order they were played")
+@click.option(
+    "--top",
+    type=click.IntRange(min=0),
+    default=3,
+    show_default=True,
+    help="Number of players to show after each game (0 for everyone)",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["table", "jsonl", "csv"]),
+    default="table",
+    show_default=True,
+    help="Output format. csv has a row per player per game, for charting the standings over time.",
+)
+@require_dbfile
+@require_current_tournament
+def history(tournament: Tournament, connection: sqlite3.Connection, top: int, output_format: str):
+    """Shows how the standings of the current tournament changed over time.
+
+    The whole timeline comes from one pass over the scores, keeping a running total for each player.
+    """
+    player_lookup = {player['id']: player['name'] for player in db.get_players(connection, tournament['id'])}
+    rows = db.iter_standings_history(connection, tournament['id'])
+
+    if output_format == "csv":
+        writer = csv.writer(click.get_text_stream("stdout"))
+        writer.writerow(["recorded_at", "session_id", "game", "position", "player", "total", "games", "average"])
+
+    for session, standings in standings_timeline(rows, top):
+        if output_format == "table":
+            click.echo(f"\n{session['recorded_at']}  {session['game']} (session {session['session_id']})")
+            for position, (player_id, total, game_count, average) in enumerate(standings, start=1):
+                click.echo(
+                    f"  {position}. {player_lookup[player_id]} -> avg: {round(average, 3)}, "
+                    f"total: {round(total, 3)}, games: {game_count}"
+                )
+        elif output_format == "jsonl":
+            click.echo(json.dumps({
+                "recorded_at": session['recorded_at'],
+                "session_id": session['session_id'],
+                "game": session['game'],
+                "standings": [
+                    {"player": player_lookup[player_id], "total": total, "games": game_count, "average": average}
+                    for player_id, total, game_count, average in standings
+                ],
+            }))
+        else:
+            for position, (player_id, total, game_count, average) in enumerate(standings, start=1):
+                writer.writerow([
+                    session['recorded_at'], session['session_id'], session['game'],
+                    position, player_lookup[player_id], total, game_count, average,
+                ])
+
+
+@scores.command(short_help="Projects everyone's chances of finishing in each position")
+@click.option("--games", type=click.IntRange(min=1), default=5, show_default=True, help="Number of games left to play")
+@click.option("--simulations", type=click.IntRange(min=1), default=10_000, show_default=True)
+@click.option("--workers", type=click.IntRange(min=1), default=1, show_default=True, help="Processes to split the simulations across")
+@click.option("--seed", type=click.IntRange(min=0), default=None, help="Seed for reproducible results (random by default)")
+@require_dbfile
+@require_current_tournament
+def simulate(tournament: Tournament, connection: sqlite3.Connection, games: int, simulations: int, workers: int, seed: int | None):
+    """Simulates the rest of the current tournament many times over, showing how likely each player is to
+    finish in each position.
+
+    Every player is assumed to play every remaining game. Each game's type and length are drawn from the
+    games played so far, and each player's result from the spread of their metascores so far.
+    """
+    from gametournament import simulation
+
+    try:
+        model = simulation.build_model(connection, tournament)
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
+    projection = simulation.project(model, simulations, games, seed, workers)
+
+    player_lookup = {player['id']: player['name'] for player in db.get_players(connection, tournament['id'])}
+    positions = range(1, len(projection.player_ids) + 1)
+    expected = projection.probabilities @ positions
+
+    click.echo(f"Chances after {games} more games ({simulations} simulations, seed {projection.seed}):\n")
+    click.echo(f"{'Player':<20}" + "".join(f"{f'#{position}':>7}" for position in positions) + f"{'Avg pos':>9}")
+    for i in expected.argsort():
+        chances = "".join(f"{probability:>7.1%}" for probability in projection.probabilities[i])
+        click.echo(f"{player_lookup[projection.player_ids[i]][:20]:<20}{chances}{expected[i]:>9.2f}")
+
+
+def standings_timeline(
+    rows: Iterable[sqlite3.Row],
+    top: int = 0,
+) -> Iterator[tuple[sqlite3.Row, list[tuple[int, float, int, float]]]]:
+    """Turns the rows of db.iter_standings_history into the standings after each game.
+
+    Yields each game's first row along with the top players' (player id, total, games, average), best
+    average first. top=0 means every player who has played so far.
+    """
+    totals: dict[int, tuple[float, int]] = {}
+    for _, session_rows in itertools.groupby(rows, key=lambda row: row['session_id']):
+        session_rows = list(session_rows)
+        for row in session_rows:
+            totals[row['player_id']] = (row['total'], row['game_count'])
+
+        standings = (
+            (player_id, total, game_count, total / game_count)
+            for player_id, (total, game_count) in totals.items()
+        )
+        if top:
+            ranked = heapq.nlargest(top, standings, key=lambda standing: standing[3])
+        else:
+            ranked = sorted(standings, key=lambda standing: standing[3], reverse=True)
+        yield session_rows[0], ranked
+
+
+@scores.command(short_help="Recalculate all scores")
+@click.option("--all", "all_tournaments", is_flag=True, help="Recalculate every tournament")
+@click.option("--ids", default=None, help="Comma-separated ids of the tournaments to recalculate")
+@click.option("--workers", type=click.IntRange(min=1), default=None, help="Processes to use (default: one per CPU)")
+@click.option("--dry-run", is_flag=True, help="Only list the changes; don't prompt or record anything")
+@require_dbfile
+def recalc(
+    connection: sqlite3.Connection,
+    all_tournaments: bool,
+    ids: str | None,
+    workers: int | None,
+    dry_run: bool,
+):
+    """Recalculates the metascores of the current tournament, or of many tournaments with --all/--ids.
+
+    Only the games whose inputs (the tournament's settings, the hours or the raw scores) have changed
+    since they were last scored are recalculated, and only the metascores that change are shown.
+    Several tournaments are recalculated in parallel, one process each, and the changes are then
+    recorded together.
+    """
+    if all_tournaments or ids:
+        recalc_many(connection, all_tournaments, ids, workers, dry_run)
+    else:
+        # Score with the settings in the db, like --all/--ids do, rather than the copy in the context file
+        recalc_current(connection, get_stored_current_tournament(connection), dry_run)
+
+
+def recalc_current(connection: sqlite3.Connection, tournament: Tournament, dry_run: bool):
+    from gametournament import recalc
+
+    recalculation = recalc.find_changes(connection, tournament)
+    if not recalculation.fingerprints:
+        click.echo("No game's inputs have changed, so there's nothing to recalculate.")
+        return
+
+    sessions = itertools.groupby(recalculation.changes, key=lambda change: (change.session_id, change.game))
+    for (session_id, game), changes in sessions:
+        click.echo(f"\n-----\nHere are the changes for game {game} (session {session_id})")
+        for change in changes:
+            click.echo(f"{change.player_name} ->  {change.old_score} -> {change.new_score}")
+    click.echo(
+        f"\n{len(recalculation.fingerprints)} games recalculated; "
+        f"{len(recalculation.changes)} scores {'would change' if recalculation.changes else 'changed'}."
+    )
+
+    if dry_run:
+        return
+    if recalculation.changes:
+        click.confirm(f"\n{'-' * 20}\nDo you want to record these scores?", default=True, abort=True)
+
+    # Even when no score changed, the new fingerprints are saved so these games are skipped next time
+    with connection:
+        changed = recalc.apply_changes(connection, recalculation)
+    if changed:
+        click.echo(f"{changed} scores changed.")
+        output_scores(db.get_scores(connection, tournament['id']))
+
+
+def recalc_many(connection: sqlite3.Connection, all_tournaments: bool, ids: str | None, workers: int | None, dry_run: bool):
+    from gametournament import recalc
+
+    if all_tournaments:
+        tournament_ids = [tournament['id'] for tournament in db.get_tournaments(connection)]
+    else:
+        try:
+            tournament_ids = [int(tournament_id) for tournament_id in ids.split(",") if tournament_id.strip()]
+        except ValueError:
+            raise click.BadParameter("must be a comma-separated list of ids", param_hint="--ids")
+        missing = [tournament_id for tournament_id in tournament_ids if db.get_tournament(connection, tournament_id) is None]
+        if missing:
+            raise click.BadParameter(f"no tournaments with ids {missing}", param_hint="--ids")
+
+    results = sorted(
+        recalc.find_changes_in_parallel(tournament_ids, workers=workers),
+        key=lambda result: result[0]['id'],
+    )
+
+    click.echo(f"{'ID':>5}  {'Tournament':<30} {'Changed':>8} {'Max change':>11}")
+    for tournament, (changes, _) in results:
+        max_change = max((abs(change.new_score - change.old_score) for change in changes), default=0)
+        click.echo(f"{tournament['id']:>5}  {tournament['name'][:30]:<30} {len(changes):>8} {max_change:>11.3f}")
+        if dry_run:
+            for change in changes:
+                click.echo(
+                    f"       {change.game} (session {change.session_id}) {change.player_name}: "
+                    f"{change.old_score} -> {change.new_score}"
+                )
+
+    total_changes = sum(len(recalculation.changes) for _, recalculation in results)
+    if dry_run:
+        click.echo(f"\n{total_changes} scores would change.")
+        return
+    if total_changes:
+        click.confirm(f"\n{'-' * 20}\nDo you want to record {total_changes} changed scores?", default=True, abort=True)
+
+    # Every worker only reads; all of the writes (including the new fingerprints) happen here, in one transaction
+    with connection:
+        changed = sum(recalc.apply_changes(connection, recalculation) for _, recalculation in results)
+    click.echo(f"{changed} scores changed.")
+
+
+@scores.command(short_help="Recomputes the running totals from the recorded scores")
+@require_dbfile
+def rebuild_standings(connection: sqlite3.Connection):
+    with connection:
+        db.rebuild_standings(connection)
+        db.rebuild_careers(connection)
+    click.echo("Standings and careers rebuilt.")
+
+
+@scores.command(name="import", short_help="Imports game results from a CSV or JSONL file")
+@click.argument("file", type=click.File("r"))
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(["csv", "jsonl"]),
+    default=None,
+    help="Format of the file. Defaults to the file's extension.",
+)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=500,
+    show_default=True,
+    help="Number of games to record per transaction",
+)
+@click.option(
+    "--add-players/--no-add-players",
+    default=True,
+    show_default=True,
+    help="Whether to add players that aren't in the tournament yet",
+)
+@require_dbfile
+@require_current_tournament
+def import_results(
+    tournament: Tournament,
+    connection: sqlite3.Connection,
+    file,
+    file_format: str | None,
+    batch_size: int,
+    add_players: bool,
+):
+    """Imports game results without prompting.
+
+    FILE is a CSV (with a header row) or JSONL file with the columns game, hours, type ("points" or
+    "rank"), player and score, and optionally session and recorded_at (an ISO 8601 time; defaults to
+    now). Consecutive rows for the same game form one play of that game. Use "-" to read from stdin.
+    """
+    from gametournament import importer
+
+    if file_format is None:
+        file_format = "jsonl" if file.name.endswith((".jsonl", ".json")) else "csv"
+
+    games = importer.group_games(importer.read_rows(file, file_format))
+    try:
+        game_count, score_count = importer.import_games(connection, tournament, games, batch_size, add_players)
+    except importer.ResultsFileError as e:
+        raise click.ClickException(f"{e} (games from batches before this one were already recorded)") from e
+
+    click.echo(f"Imported {score_count} scores from {game_count} games.")
+    output_scores(db.get_scores(connection, tournament['id']))
+    if add_players:
+        refresh_completion_cache(connection)
@@ -0,0 +1,35 @@
+import click
+
+from gametournament import db
+
+
+@click.command(short_help="Serves live standings and score submission over local HTTP")
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to listen on")
+@click.option("--port", type=click.IntRange(1, 65535), default=8080, show_default=True)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Number of threads (and database connections) for database work",
+)
+def serve(host: str, port: int, workers: int):
+    """Runs a local HTTP/JSON server for display boards and tablets.
+
+    See gametournament/server.py for the routes. The server never needs a network connection; by default
+    it only listens on localhost.
+    """
+    import asyncio
+    import logging
+
+    from gametournament.server import TournamentServer
+
+    if not db.DB_FILE.exists():
+        raise click.Abort("You need to run the init command!")
+
+    logging.basicConfig(level=logging.INFO)
+    click.echo(f"Serving tournaments on http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        asyncio.run(TournamentServer(workers=workers).serve_forever(host, port))
+    except KeyboardInterrupt:
+        click.echo("Stopped.")
@@ -0,0 +1,123 @@
+import shlex
+import sqlite3
+from typing import TYPE_CHECKING
+
+import click
+
+from gametournament.commands import require_dbfile, require_current_tournament, pretty_print_game_scores, output_scores
+from gametournament.models import Tournament
+
+if TYPE_CHECKING:
+    from gametournament.scorekeeper import Scorekeeper
+
+HELP = """\
+Enter a game as GAME [HOURS] [points|rank] PLAYER=SCORE ..., for example:
+  catan ann=10 bob=7 cy=3
+  "Ticket to Ride" 2 points ann=90 bob=72
+Games and players can be shortened to the start of their names, and games can be given by their number
+in "games". Known games default to the hours and score type they were last played with.
+
+Commands:
+  get          Show the standings, including the games that haven't been flushed
+  undo         Take back the latest game that hasn't been flushed
+  flush        Save the games entered so far
+  games        List the known games and their numbers
+  players      List the players
+  record ...   Enter a game whose name is one of these commands
+  help         Show this help
+  quit         Flush and leave (as does Ctrl-D)
+"""
+
+
+@click.command(short_help="Starts an interactive session for entering scores quickly")
+@click.option(
+    "--flush-every",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Flush automatically after this many games (0 means only on flush and quit)",
+)
+@require_dbfile
+@require_current_tournament
+def session(tournament: Tournament, connection: sqlite3.Connection, flush_every: int):
+    """Keeps the current tournament open for entering game after game, one line each.
+
+    Games are kept in the session until it flushes: on "flush", on quitting, and every --flush-every
+    games. Until then, "undo" can take them back. Flushing writes them all in one short transaction, so
+    the session never holds up other writers (such as the server).
+    """
+    from gametournament.scorekeeper import EntryError, Scorekeeper
+
+    try:
+        import readline  # noqa: F401 (gives input() line editing and history)
+    except ImportError:
+        pass
+
+    scorekeeper = Scorekeeper(connection, tournament)
+    player_lookup = {player['id']: player['name'] for player in scorekeeper.players}
+    click.echo(f"Scoring {tournament['name']}. Type \"help\" for how to enter games.")
+
+    while True:
+        try:
+            line = input(f"{tournament['name']} ({len(scorekeeper.pending)} unflushed)> ")
+        except KeyboardInterrupt:
+            click.echo()
+            continue
+        except EOFError:
+            # There's no more input to retry with, so this is the last chance to save
+            click.echo()
+            flush(scorekeeper)
+            break
+
+        try:
+            words = shlex.split(line)
+        except ValueError as e:
+            click.echo(f"Couldn't read that: {e}")
+            continue
+        if not words:
+            continue
+
+        match words[0].lower():
+            case "quit" | "exit":
+                if flush(scorekeeper):
+                    break
+            case "help":
+                click.echo(HELP)
+            case "get":
+                output_scores(scorekeeper.standings())
+            case "undo":
+                recorded = scorekeeper.undo()
+                if recorded is None:
+                    click.echo("There are no unflushed games to undo.")
+                else:
+                    click.echo(f"Took back {recorded.game.name}.")
+            case "flush":
+                flush(scorekeeper)
+            case "games":
+                for number, game in enumerate(scorekeeper.games.values(), start=1):
+                    click.echo(f"{number:>3}. {game.name} ({game.hours:g}h, {game.score_type})")
+            case "players":
+                click.echo(", ".join(player['name'] for player in scorekeeper.players))
+            case command:
+                entry = words[1:] if command == "record" else words
+                try:
+                    recorded = scorekeeper.record(*scorekeeper.parse_entry(entry))
+                except EntryError as e:
+                    click.echo(f"Not recorded: {e}")
+                    continue
+                click.echo(f"{recorded.game.name} ({recorded.game.hours:g}h, {recorded.game.score_type}):")
+                pretty_print_game_scores(player_lookup, recorded.scores.values())
+                if flush_every and len(scorekeeper.pending) >= flush_every:
+                    flush(scorekeeper)
+
+
+def flush(scorekeeper: "Scorekeeper") -> bool:
+    """Flushes the pending games, returning whether that worked. If it didn't, the games are still pending."""
+    if not scorekeeper.pending:
+        return True
+    try:
+        click.echo(f"Saved {scorekeeper.flush()} games.")
+    except sqlite3.Error as e:
+        click.echo(f"Couldn't save the {len(scorekeeper.pending)} unflushed games ({e}); try flushing again.")
+        return False
+    return True
@@ -0,0 +1,393 @@
+import csv
+import io
+import itertools
+import json
+import sqlite3
+import textwrap
+from datetime import datetime
+from pathlib import Path
+from typing import Sequence
+
+import click
+
+from gametournament import db, tournament_tools
+from gametournament.commands import (
+    CachedValue,
+    TournamentId,
+    get_stored_current_tournament,
+    refresh_completion_cache,
+    require_dbfile,
+    require_current_tournament,
+)
+from gametournament.constants import DEFAULT_DURATION_MULTIPLIER, DEFAULT_RANK_MULTIPLIER
+from gametournament.models import Tournament
+
+LOG_CHUNK_SIZE = 500
+
+
+@click.group(short_help="Commands related to tournaments")
+def tournament():
+    pass
+
+@tournament.command(short_help="Creates a new tournament")
+@click.argument("name")
+@click.option(
+    '-r',
+    '--rank-multiplier',
+    type=click.FLOAT,
+    default=DEFAULT_RANK_MULTIPLIER,
+    show_default=True,
+    help="Multiplier to apply to the INVERSE rank for a game",
+    prompt=True
+)
+@click.option(
+    '-d',
+    '--duration-multiplier',
+    type=click.FLOAT,
+    default=DEFAULT_DURATION_MULTIPLIER,
+    show_default=True,
+    help="Multiplier to apply to the number of game hours. Set this to 0 if you don't want to apply duration bonus.",
+    prompt=True,
+)
+@click.option(
+    '--bonus/--no-bonus',
+    default=True,
+    show_default=True,
+    help="Whether to apply a bonus or penalty to metascores on basis of standard deviations from average",
+    prompt=True,
+)
+@require_dbfile
+def new(
+    connection: sqlite3.Connection,
+    name: str,
+    rank_multiplier: float,
+    duration_multiplier: float,
+    bonus: bool,
+):
+    tournament = Tournament(
+        name=name,
+        start_date=datetime.now(),
+        rank_multiplier=rank_multiplier,
+        duration_multiplier=duration_multiplier,
+        apply_bonus_or_penalty=bonus,
+    )
+    tournament = db.create_tournament(connection, tournament)
+    players = []
+    while True:
+        player = click.prompt("Enter player name or hit enter if finished", default="", show_default=False)
+        if player.strip() == "":
+            break
+        players.append(player)
+    db.insert_players(connection, tournament['id'], players)
+    tournament_tools.set_current_tournament(tournament)
+    refresh_completion_cache(connection)
+
+@tournament.command(short_help="Gets current tournament info")
+@require_dbfile
+@require_current_tournament
+def get(tournament: Tournament, connection: sqlite3.Connection):
+    import yaml
+
+    click.echo("Current Tournament:")
+    click.echo("-" * 20)
+    as_yaml = yaml.dump(tournament)
+    indented = textwrap.indent(as_yaml, '>> ')
+    click.echo(indented)
+    click.echo("Tournament Players:")
+    click.echo("-" * 20)
+    players = db.get_players(connection, tournament['id'])
+    for player in players:
+        click.echo(f">> {player['name']}")
+
+@tournament.command(short_help="Selects a pre-existing tournament as the current tournament")
+@click.argument("tournament-id", type=TournamentId(), required=False)
+@require_dbfile
+def select(connection: sqlite3.Connection, tournament_id: int | None):
+    """Selects the tournament with TOURNAMENT_ID, or asks which one to select if it isn't given."""
+    if tournament_id is not None:
+        tournament = db.get_tournament(connection, tournament_id)
+        if tournament is None:
+            raise click.BadParameter(f"no tournament with id {tournament_id}", param_hint="TOURNAMENT_ID")
+        click.echo(f"Setting tournament named \"{tournament["name"]}\" as current tournament.")
+        tournament_tools.set_current_tournament(tournament)
+        refresh_completion_cache(connection)
+        return
+
+    tournaments = db.get_tournaments(connection)
+    tournament_map = {}
+    tournament_selection = "Select tournament by id\n"
+
+    if len(tournaments) == 0:
+        click.echo("No tournaments to select")
+        raise click.Abort()
+
+    for tournament in tournaments:
+        tournament_map[tournament['id']] = tournament
+        tournament_selection += f'* {tournament["start_date"]}\tID: {tournament["id"]}\t{tournament["name"]}\n'
+
+    tournament_selection_lines = tournament_selection.splitlines()
+    if len(tournament_selection_lines) > 10:
+        click.echo_via_pager(tournament_selection_lines)
+    else:
+        click.echo(tournament_selection)
+
+    tournament_id = click.prompt("Which id do you want to select?", type=click.INT)
+    tournament = tournament_map[tournament_id]
+    click.echo(f"Setting tournament named \"{tournament["name"]}\" as current tournament.")
+    tournament_tools.set_current_tournament(tournament)
+    refresh_completion_cache(connection)
+
+@tournament.command(short_help="Adds a player to a tournament")
+@click.argument("player-name")
+@require_dbfile
+@require_current_tournament
+def add_player(tournament: Tournament, connection: sqlite3.Connection, player_name):
+    player_name = player_name.strip()
+    if player_name == "":
+        raise click.Abort("Invalid player name!")
+
+    db.insert_players(connection, tournament['id'], [player_name])
+    click.echo(f"Player {player_name} added to tournament: {tournament['name']}")
+    refresh_completion_cache(connection)
+
+@tournament.command(short_help="Displays the scoring formulae for the tournament")
+@require_current_tournament
+def show_formulae(tournament: Tournament):
+    from gametournament.point_scorer import PointFormula
+    from gametournament.rank_scorer import RankFormula
+
+    point_formula = PointFormula(tournament, 1).show()
+    rank_formula = RankFormula(tournament, 1).show()
+    click.echo(f"Metascore formula for point-based games:\n\t{point_formula}")
+    click.echo(f"\nMetascore formula for rank-based games:\n\t{rank_formula}")
+
+@tournament.command(short_help="Gets ALL scores currently entered for the tournament")
+@click.option("--game", default=None, help="Only show scores for this game")
+@click.option("--player", type=CachedValue("player"), default=None, help="Only show scores for this player")
+@click.option("--limit", type=click.IntRange(min=0), default=None, help="Maximum number of scores to show")
+@click.option("--offset", type=click.IntRange(min=0), default=0, help="Number of scores to skip")
+@click.option(
+    "--after",
+    "after_id",
+    type=click.INT,
+    default=None,
+    help="Only show scores recorded after the score with this id. Faster than --offset for paging.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["table", "jsonl", "csv"]),
+    default="table",
+    show_default=True,
+)
+@require_dbfile
+@require_current_tournament
+def log(
+    tournament: Tournament,
+    connection: sqlite3.Connection,
+    game: str | None,
+    player: str | None,
+    limit: int | None,
+    offset: int,
+    after_id: int | None,
+    output_format: str,
+):
+    records = db.iter_records(
+        connection,
+        tournament['id'],
+        game=game,
+        player=player,
+        after_id=after_id,
+        limit=limit,
+        offset=offset,
+        chunk_size=LOG_CHUNK_SIZE,
+    )
+    # Each chunk is formatted and written in one go, rather than echoing (and flushing) line by line
+    stdout = click.get_text_stream("stdout")
+    for index, chunk in enumerate(itertools.batched(records, LOG_CHUNK_SIZE)):
+        stdout.write(format_records(chunk, output_format, include_header=index == 0))
+    stdout.flush()
+
+
+def format_records(records: Sequence[sqlite3.Row], output_format: str, include_header: bool) -> str:
+    match output_format:
+        case "jsonl":
+            return "".join(json.dumps(dict(record)) + "\n" for record in records)
+        case "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            if include_header:
+                writer.writerow(records[0].keys())
+            writer.writerows(records)
+            return buffer.getvalue()
+        case _:
+            return "".join(
+                "".join(f"| {key}: {value} " for key, value in zip(record.keys(), record)) + "\n"
+                for record in records
+            )
+
+
+def parse_values(ctx: click.Context, param: click.Parameter, value: str | None) -> list[float] | None:
+    """Parses a comma-separated list of numbers and start:stop:step ranges (which include stop)."""
+    if value is None:
+        return None
+    values = []
+    for item in value.split(","):
+        try:
+            parts = [float(part) for part in item.split(":")]
+        except ValueError:
+            raise click.BadParameter(f"'{item}' is not a number or start:stop:step range", ctx, param)
+        if len(parts) == 1:
+            values.extend(parts)
+            continue
+        if len(parts) != 3 or parts[2] <= 0 or parts[1] < parts[0]:
+            raise click.BadParameter(f"'{item}' must be start:stop:step, with step > 0 and stop >= start", ctx, param)
+        start, stop, step = parts
+        count = int(round((stop - start) / step, 9)) + 1
+        values.extend(round(start + i * step, 9) for i in range(count))
+    return values
+
+
+@tournament.command(short_help="Compares the standings under many formula settings")
+@click.option(
+    "-r",
+    "--rank-multiplier",
+    "rank_multipliers",
+    callback=parse_values,
+    default=None,
+    help="Rank multipliers to try, e.g. 1,2,3 or 1:3:0.5 (default: the tournament's)",
+)
+@click.option(
+    "-d",
+    "--duration-multiplier",
+    "duration_multipliers",
+    callback=parse_values,
+    default=None,
+    help="Duration multipliers to try, e.g. 0,1.5 or 0:2:0.25 (default: the tournament's)",
+)
+@click.option(
+    "--bonus",
+    type=click.Choice(["both", "on", "off"]),
+    default="both",
+    show_default=True,
+    help="Whether to try the settings with the +/- standard deviations bonus, without it, or both",
+)
+@click.option(
+    "--output",
+    type=click.File("w"),
+    default=None,
+    help="CSV file to write every setting's winner and rank correlation to",
+)
+@require_dbfile
+def sweep(
+    connection: sqlite3.Connection,
+    rank_multipliers: list[float] | None,
+    duration_multipliers: list[float] | None,
+    bonus: str,
+    output,
+):
+    """Recalculates the current tournament's standings under every combination of the given settings, and
+    shows how much each player's finishing position depends on them.
+
+    The rank correlation is Spearman's, between a setting's finishing order and the current one.
+    """
+    import time
+
+    from gametournament import sweep as parameter_sweep
+
+    tournament = get_stored_current_tournament(connection)
+    bonus_options = {"both": [True, False], "on": [True], "off": [False]}[bonus]
+    start = time.perf_counter()
+    result = parameter_sweep.sweep(
+        connection,
+        tournament,
+        rank_multipliers or [tournament['rank_multiplier']],
+        duration_multipliers or [tournament['duration_multiplier']],
+        bonus_options,
+    )
+    elapsed = time.perf_counter() - start
+
+    player_lookup = {player['id']: player['name'] for player in db.get_players(connection, tournament['id'])}
+    correlations = result.rank_correlations()
+    winners = result.positions.argmin(axis=1)
+    current_winner = result.current_positions.argmin()
+
+    click.echo(f"Swept {len(result.settings)} settings in {elapsed:.2f}s\n")
+    click.echo(f"{'Player':<20}{'Current':>8}{'Best':>6}{'Worst':>7}{'Mean':>7}{'Won':>8}")
+    for i in result.current_positions.argsort():
+        positions = result.positions[:, i] + 1
+        click.echo(
+            f"{player_lookup[result.player_ids[i]][:20]:<20}{result.current_positions[i] + 1:>8}"
+            f"{positions.min():>6}{positions.max():>7}{positions.mean():>7.2f}{(winners == i).mean():>8.1%}"
+        )
+
+    least_similar = correlations.argmin()
+    click.echo(f"\nThe current winner wins under {(winners == current_winner).mean():.1%} of the settings.")
+    click.echo(f"Rank correlation with the current standings: mean {correlations.mean():.3f}, min {correlations.min():.3f}")
+    rank_multiplier, duration_multiplier, apply_bonus_or_penalty = result.settings[least_similar]
+    click.echo(
+        f"Least similar setting: rank multiplier {rank_multiplier}, duration multiplier {duration_multiplier}, "
+        f"{'with' if apply_bonus_or_penalty else 'without'} bonus ({correlations[least_similar]:.3f})"
+    )
+
+    if output is not None:
+        writer = csv.writer(output)
+        writer.writerow(["rank_multiplier", "duration_multiplier", "apply_bonus_or_penalty", "winner", "rank_correlation"])
+        for setting, winner, correlation in zip(result.settings, winners, correlations):
+            writer.writerow([*setting, player_lookup[result.player_ids[winner]], correlation])
+
+
+@tournament.command(short_help="Exports a tournament to columnar files for analytics")
+@click.argument("directory", type=click.Path(file_okay=False, path_type=Path))
+@click.option(
+    "--format",
+    "bundle_format",
+    type=click.Choice(["npy", "parquet"]),
+    default="npy",
+    show_default=True,
+    help="npy files can be memory-mapped with numpy.load; parquet needs pyarrow",
+)
+@click.option("--id", "tournament_id", type=TournamentId(), default=None, help="Tournament to export (default: the current one)")
+@require_dbfile
+def export(connection: sqlite3.Connection, directory: Path, bundle_format: str, tournament_id: int | None):
+    """Writes the tournament's settings, players, game sessions and scores to DIRECTORY.
+
+    The sessions and scores are written as columns (sessions.<column>.npy and scores.<column>.npy, or
+    sessions.parquet and scores.parquet), along with a meta.json of everything else.
+    """
+    from gametournament import columnar
+
+    if tournament_id is None:
+        tournament = get_stored_current_tournament(connection)
+    else:
+        tournament = db.get_tournament(connection, tournament_id)
+        if tournament is None:
+            raise click.BadParameter(f"no tournament with id {tournament_id}", param_hint="--id")
+    try:
+        session_count, score_count = columnar.export_tournament(connection, tournament, directory, bundle_format)
+    except columnar.BundleError as e:
+        raise click.ClickException(str(e)) from e
+    click.echo(f"Exported {session_count} games and {score_count} scores of {tournament['name']} to {directory}")
+
+
+@tournament.command(name="import", short_help="Imports a tournament exported with the export command")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.option("--name", default=None, help="Name for the new tournament (default: the exported one's)")
+@click.option("--select/--no-select", default=True, show_default=True, help="Whether to make it the current tournament")
+@require_dbfile
+def import_tournament(connection: sqlite3.Connection, directory: Path, name: str | None, select: bool):
+    """Creates a new tournament from the files in DIRECTORY, in a single transaction.
+
+    The scores are inserted as they were exported, without being recalculated.
+    """
+    from gametournament import columnar
+
+    try:
+        with connection:
+            tournament, session_count, score_count = columnar.import_tournament(connection, directory, name)
+    except columnar.BundleError as e:
+        raise click.ClickException(str(e)) from e
+    click.echo(f"Imported {session_count} games and {score_count} scores as {tournament['name']} (id {tournament['id']})")
+    if select:
+        tournament_tools.set_current_tournament(tournament)
+    refresh_completion_cache(connection)
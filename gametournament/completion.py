@@ -0,0 +1,190 @@
+"""Shell completion that answers from a cache file, without importing click or the rest of the app.
+
+The completion scripts (completions.bash and completions.zsh) run the game-tournament-complete entry
+point, which speaks the same protocol as click's own completion: the words typed so far come in the
+COMP_WORDS and COMP_CWORD environment variables, the shell in _GAME_TOURNAMENT_COMPLETE (bash_complete
+or zsh_complete), and the completions go out on stdout in click's format.
+
+The cache holds the command tree (every command's subcommands, options and arguments, and what kind of
+value each one takes) along with the tournament ids, the current tournament's player names and the names
+of everyone who has played. The app rewrites it whenever any of those change (see
+gametournament.commands.refresh_completion_cache). If the cache is missing, or older than the command
+modules, this falls back to click's completion through the full app once, refreshing the cache as it goes.
+
+This module runs on every tab press, so it only imports the few standard library modules it needs (not
+even pathlib, which is slow to import) and works with plain path strings.
+"""
+import json
+import os
+import shlex
+import sys
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = os.path.join(os.path.dirname(PACKAGE_DIR), "completion-cache.json")
+CACHE_VERSION = 1
+COMPLETE_VAR = "_GAME_TOURNAMENT_COMPLETE"
+
+# The cache key holding the names of each kind of name value
+CACHED_NAMES = {"player": "players", "person": "people"}
+
+type Completion = tuple[str, str, str | None]
+
+
+def command_sources() -> list[str]:
+    """The modules that define the commands; the cache is stale once any of them is newer than it."""
+    commands_dir = os.path.join(PACKAGE_DIR, "commands")
+    return [
+        os.path.join(os.path.dirname(PACKAGE_DIR), "main.py"),
+        *(os.path.join(commands_dir, name) for name in os.listdir(commands_dir) if name.endswith(".py")),
+    ]
+
+
+def load_cache(path: str = None) -> dict | None:
+    """Loads the cache, or returns None if it's missing, unreadable, or older than the command modules."""
+    path = path or CACHE_FILE
+    try:
+        cache_mtime = os.stat(path).st_mtime
+        if any(os.stat(source).st_mtime > cache_mtime for source in command_sources() if os.path.exists(source)):
+            return None
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return cache if cache.get("version") == CACHE_VERSION else None
+
+
+def write_cache(data: dict, path: str = None):
+    """Writes the cache atomically, so a tab press never reads half of it."""
+    path = path or CACHE_FILE
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(dict(data, version=CACHE_VERSION), f)
+    os.replace(temp_path, path)
+
+
+def cached_values(cache: dict, kind: str, incomplete: str) -> list[Completion]:
+    """Gets the cached values of a kind (tournament, player or person) that start with incomplete."""
+    if kind == "tournament":
+        values = [(str(tournament_id), name) for tournament_id, name in cache.get("tournaments", [])]
+    else:
+        values = [(name, None) for name in cache.get(CACHED_NAMES[kind], [])]
+    return [("plain", value, help_) for value, help_ in values if value.startswith(incomplete)]
+
+
+def complete(cache: dict, args: list[str], incomplete: str) -> list[Completion]:
+    """Gets the completions of incomplete, after the complete args (not including the program name)."""
+    node = cache["commands"]
+    used_options = set()
+    pending = None
+    positional = 0
+    for arg in args:
+        if pending is not None:
+            pending = None
+        elif arg.startswith("-") and arg.partition("=")[0] in node["options"]:
+            name, equals, _ = arg.partition("=")
+            used_options.add(name)
+            if node["options"][name]["value"] is not None and not equals:
+                pending = node["options"][name]["value"]
+        elif arg in node["commands"]:
+            node = node["commands"][arg]
+            used_options = set()
+            positional = 0
+        else:
+            positional += 1
+
+    if incomplete == "=":
+        incomplete = ""
+    elif pending is None and incomplete.startswith("--") and "=" in incomplete:
+        name, _, incomplete = incomplete.partition("=")
+        pending = node["options"].get(name, {}).get("value")
+
+    if pending is not None:
+        return value_completions(cache, pending, incomplete)
+    if incomplete.startswith("-"):
+        return [
+            ("plain", name, option["help"])
+            for name, option in node["options"].items()
+            if name.startswith(incomplete) and name not in used_options
+        ]
+    if node["commands"]:
+        return [
+            ("plain", name, command["help"])
+            for name, command in node["commands"].items()
+            if name.startswith(incomplete)
+        ]
+    if positional < len(node["arguments"]):
+        return value_completions(cache, node["arguments"][positional], incomplete)
+    return []
+
+
+def value_completions(cache: dict, value: dict, incomplete: str) -> list[Completion]:
+    match value["type"]:
+        case "choice":
+            return [("plain", choice, None) for choice in value["choices"] if choice.startswith(incomplete)]
+        case "file" | "dir":
+            return [(value["type"], incomplete, None)]
+        case "tournament" | "player" | "person":
+            return cached_values(cache, value["type"], incomplete)
+        case _:
+            return []
+
+
+def split_words(line: str) -> list[str]:
+    """Splits the command line like a shell would, keeping an unclosed quote's partial word (as click does)."""
+    lexer = shlex.shlex(line, posix=True)
+    lexer.whitespace_split = True
+    lexer.commenters = ""
+    words = []
+    try:
+        for word in lexer:
+            words.append(word)
+    except ValueError:
+        words.append(lexer.token)
+    return words
+
+
+def format_completion(shell: str, completion: Completion) -> str:
+    completion_type, value, help_ = completion
+    if shell == "zsh_complete":
+        help_ = help_ or "_"
+        # Same as click: colons in the value are only escaped for the items that _describe shows with help
+        value = value.replace(":", r"\:") if help_ != "_" else value
+        return f"{completion_type}\n{value}\n{help_}"
+    return f"{completion_type},{value}"
+
+
+def fall_back_to_click() -> int:
+    """Completes through the full app, refreshing the cache so the next tab press can use it."""
+    from main import cli
+    from gametournament import db
+    from gametournament.commands import refresh_completion_cache
+
+    if db.DB_FILE.exists():
+        with db.get_connection() as connection:
+            refresh_completion_cache(connection, cli)
+    else:
+        refresh_completion_cache(None, cli)
+    # This exits once it has printed the completions
+    return cli.main(prog_name="game-tournament", complete_var=COMPLETE_VAR)
+
+
+def main() -> int:
+    shell = os.environ.get(COMPLETE_VAR)
+    if shell not in ("bash_complete", "zsh_complete"):
+        print(f"Run this from completions.bash or completions.zsh, with {COMPLETE_VAR} set", file=sys.stderr)
+        return 1
+
+    cache = load_cache()
+    if cache is None:
+        return fall_back_to_click()
+
+    words = split_words(os.environ.get("COMP_WORDS", ""))
+    current = int(os.environ.get("COMP_CWORD", 0))
+    args = words[1:current]
+    incomplete = words[current] if current < len(words) else ""
+    print("\n".join(format_completion(shell, completion) for completion in complete(cache, args, incomplete)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,23 +1,93 @@
+import itertools
+import operator
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator
 
+from gametournament import fingerprint, ratings
 from gametournament.models import TourneyScore, Tournament, Player
+from gametournament.score_batch import ScoreBatch
 
 DB_FILE = Path(__file__).parent.parent / "tournament.db"
 
 
-def get_connection():
-    connection = sqlite3.connect(str(DB_FILE), detect_types=True)
+BUSY_TIMEOUT_SECONDS = 5
+
+# These are set on every connection from get_connection. WAL lets readers keep going while a score is being
+# recorded, and with WAL, synchronous=NORMAL only syncs at checkpoints while staying safe from corruption.
+CONNECTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -32_000,  # Negative means KiB, so this is ~32MB
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+    "busy_timeout": BUSY_TIMEOUT_SECONDS * 1000,
+}
+
+# Children before parents, so dropping a table never leaves rows pointing at a missing one
+TABLES = ["ratings", "careers", "standings", "scores", "game_sessions", "players", "people", "tournaments"]
+
+
+def get_connection(path: Path = None, tuned: bool = True, check_same_thread: bool = True) -> sqlite3.Connection:
+    connection = sqlite3.connect(
+        str(path or DB_FILE),
+        detect_types=True,
+        timeout=BUSY_TIMEOUT_SECONDS,
+        check_same_thread=check_same_thread,
+    )
     connection.row_factory = sqlite3.Row
+    if tuned:
+        for pragma, value in CONNECTION_PRAGMAS.items():
+            connection.execute(f"PRAGMA {pragma} = {value};")
     return connection
 
 
+class ConnectionPool:
+    """Hands out reusable connections to long-lived callers, such as a server's worker threads.
+
+    At most size connections are ever opened; they're created as they're needed and callers block until
+    one is free. Each connection is only ever used by one thread at a time.
+    """
+    def __init__(self, path: Path = None, size: int = 4):
+        self.path = path
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: queue.SimpleQueue[sqlite3.Connection] = queue.SimpleQueue()
+        self._all: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrows a connection, committing when the block finishes (or rolling back if it raises)."""
+        with self._slots:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = get_connection(self.path, check_same_thread=False)
+                with self._lock:
+                    self._all.append(connection)
+            try:
+                with connection:
+                    yield connection
+            finally:
+                self._idle.put(connection)
+
+    def close(self):
+        with self._lock:
+            for connection in self._all:
+                connection.close()
+            self._all.clear()
+
+
 def create_tables(connection: sqlite3.Connection):
     cursor = connection.cursor()
+    for table in TABLES:
+        cursor.execute(f"DROP TABLE IF EXISTS {table};")
 
-    cursor.execute("DROP TABLE IF EXISTS tournaments;")
     cursor.execute("""
         CREATE TABLE tournaments (
             id integer PRIMARY KEY,
@@ -25,37 +95,123 @@ def create_tables(connection: sqlite3.Connection):
             start_date TEXT NOT NULL,
             rank_multiplier REAL NOT NULL,
             duration_multiplier REAL NOT NULL,
-            apply_bonus_or_penalty BOOLEAN NOT NULL
+            apply_bonus_or_penalty BOOLEAN NOT NULL,
+            revision INTEGER NOT NULL DEFAULT 0
+        );
+    """)
+
+    # A person is everyone in any tournament with the same name, so their players can be linked up
+    cursor.execute("""
+        CREATE TABLE people (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE
         );
     """)
 
-    cursor.execute("DROP TABLE IF EXISTS players;")
     cursor.execute(
         """
         CREATE TABLE players (
             id INTEGER PRIMARY KEY,
             name TEXT NOT NULL,
             tournament_id INTEGER NOT NULL,
-            FOREIGN KEY (tournament_id) REFERENCES tournaments(id)
+            person_id INTEGER,
+            FOREIGN KEY (tournament_id) REFERENCES tournaments(id),
+            FOREIGN KEY (person_id) REFERENCES people(id)
         );
         """
     )
+    cursor.execute("CREATE INDEX players_by_person ON players(person_id);")
 
-    cursor.execute("DROP TABLE IF EXISTS scores")
     cursor.execute("""
-        CREATE TABLE scores (
-            score_id INTEGER PRIMARY KEY,
+        CREATE TABLE game_sessions (
+            id INTEGER PRIMARY KEY,
+            tournament_id INTEGER NOT NULL,
             game TEXT NOT NULL,
             hours REAL NOT NULL,
+            score_type TEXT NOT NULL,
+            recorded_at TEXT NOT NULL,
+            -- See gametournament.fingerprint; NULL for sessions that have never been fingerprinted
+            fingerprint INTEGER,
+            FOREIGN KEY (tournament_id) REFERENCES tournaments(id)
+        );
+    """)
+    # For the as-of standings and history, which read a tournament's sessions in time order
+    cursor.execute("CREATE INDEX game_sessions_by_time ON game_sessions(tournament_id, recorded_at);")
+
+    cursor.execute("""
+        CREATE TABLE scores (
+            score_id INTEGER PRIMARY KEY,
+            session_id INTEGER NOT NULL,
             player_id INTEGER NOT NULL,
             score REAL NOT NULL,
             points_or_rank INTEGER NOT NULL,
-            game_score_type TEXT NOT NULL,
             tournament_id INTEGER NOT NULL,
+            FOREIGN KEY (session_id) REFERENCES game_sessions(id),
+            FOREIGN KEY (player_id) REFERENCES players(id),
+            FOREIGN KEY (tournament_id) REFERENCES tournaments(id)
+        );
+    """)
+    # These cover the columns recalc and the standings read, so they never need to visit the table itself
+    cursor.execute("""
+        CREATE INDEX scores_by_session ON scores(tournament_id, session_id, player_id, points_or_rank, score);
+    """)
+    cursor.execute("CREATE INDEX scores_by_player ON scores(player_id, score);")
+
+    create_standings_table(cursor)
+    create_careers_table(cursor)
+    create_ratings_table(cursor)
+
+
+def create_standings_table(cursor: sqlite3.Cursor):
+    """The standings table holds each player's running totals, so reading the leaderboard doesn't need to
+    aggregate the scores table. It's kept up to date by insert_players, record_scores and update_scores.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS standings (
+            player_id INTEGER PRIMARY KEY,
+            tournament_id INTEGER NOT NULL,
+            total REAL NOT NULL,
+            game_count INTEGER NOT NULL,
+            average REAL NOT NULL,
             FOREIGN KEY (player_id) REFERENCES players(id),
             FOREIGN KEY (tournament_id) REFERENCES tournaments(id)
         );
     """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS standings_by_average ON standings(tournament_id, average DESC);")
+
+
+def create_careers_table(cursor: sqlite3.Cursor):
+    """The careers table holds each person's running totals per game, across every tournament they've
+    played in. Like the standings, it's kept up to date by record_scores and update_scores.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS careers (
+            person_id INTEGER NOT NULL,
+            game TEXT NOT NULL,
+            games_played INTEGER NOT NULL,
+            total REAL NOT NULL,
+            wins INTEGER NOT NULL,
+            PRIMARY KEY (person_id, game),
+            FOREIGN KEY (person_id) REFERENCES people(id)
+        ) WITHOUT ROWID;
+    """)
+
+
+def create_ratings_table(cursor: sqlite3.Cursor):
+    """The ratings table holds each player's skill rating (see gametournament.ratings). Players who haven't
+    played yet have no row. It's kept up to date by record_scores.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ratings (
+            player_id INTEGER PRIMARY KEY,
+            tournament_id INTEGER NOT NULL,
+            rating REAL NOT NULL,
+            game_count INTEGER NOT NULL,
+            FOREIGN KEY (player_id) REFERENCES players(id),
+            FOREIGN KEY (tournament_id) REFERENCES tournaments(id)
+        );
+    """)
+
 
 def insert_players(connection: sqlite3.Connection, tournament_id: int, player_names: list[str]):
     cursor = connection.cursor()
@@ -63,6 +219,18 @@ def insert_players(connection: sqlite3.Connection, tournament_id: int, player_na
         INSERT INTO players(name, tournament_id)
         VALUES (?, ?)
     """, [(name, tournament_id) for name in player_names])
+    cursor.executemany("INSERT INTO people(name) VALUES (?) ON CONFLICT (name) DO NOTHING;", [(name,) for name in player_names])
+    cursor.execute("""
+        UPDATE players SET person_id = (SELECT id FROM people WHERE people.name = players.name)
+        WHERE tournament_id = ? AND person_id IS NULL
+    """, (tournament_id,))
+    cursor.execute("""
+        INSERT INTO standings(player_id, tournament_id, total, game_count, average)
+        SELECT id, tournament_id, 0, 0, 0
+        FROM players
+        WHERE tournament_id = ? AND id NOT IN (SELECT player_id FROM standings)
+    """, (tournament_id,))
+    bump_revision(connection, tournament_id)
 
 def create_tournament(connection: sqlite3.Connection, tournament: Tournament) -> Tournament:
     cursor = connection.cursor()
@@ -97,6 +265,13 @@ def get_tournaments(connection: sqlite3.Connection) -> list[Tournament]:
     return tournaments
 
 
+def get_tournament(connection: sqlite3.Connection, tournament_id: int) -> Tournament | None:
+    cursor = connection.cursor()
+    cursor.execute("SELECT * FROM tournaments WHERE id = ?;", (tournament_id,))
+    result = cursor.fetchone()
+    return None if result is None else Tournament(result)
+
+
 def get_players(connection: sqlite3.Connection, tournament_id: int) -> list[Player]:
     cursor = connection.cursor()
     cursor.execute("SELECT id, name FROM players WHERE tournament_id = ?;", (tournament_id,))
@@ -105,31 +280,76 @@ def get_players(connection: sqlite3.Connection, tournament_id: int) -> list[Play
     return players
 
 
-def record_scores(connection: sqlite3.Connection, tournament_id: int, game: str, hours: float, scores: Iterable[TourneyScore]):
+def record_scores(
+    connection: sqlite3.Connection,
+    tournament_id: int,
+    game: str,
+    hours: float,
+    scores: Iterable[TourneyScore],
+    recorded_at: datetime = None,
+) -> int:
+    """Records the scores for one play of a game, returning the id of the new game session.
+
+    recorded_at is when the game was played, which defaults to now.
+    """
+    scores = list(scores)
+    recorded_at = recorded_at or datetime.now()
+    score_type = scores[0]['game_score_type']
+    session_fingerprint = fingerprint.session_fingerprint(
+        get_tournament(connection, tournament_id),
+        hours,
+        score_type,
+        [(score['player_id'], score['game_score']) for score in scores],
+    )
     cursor = connection.cursor()
+    cursor.execute("""
+        INSERT INTO game_sessions(tournament_id, game, hours, score_type, recorded_at, fingerprint)
+        VALUES (?, ?, ?, ?, ?, ?)
+        RETURNING id;
+    """, (tournament_id, game, hours, score_type, recorded_at.isoformat(), session_fingerprint))
+    session_id = cursor.fetchone()['id']
+
     params = [
-        (game, hours, score['player_id'], score['tournament_score'], tournament_id, score['game_score'], score['game_score_type'])
+        (session_id, score['player_id'], score['tournament_score'], tournament_id, score['game_score'])
         for score in scores
     ]
     query = """
-        INSERT INTO scores(game, hours, player_id, score, tournament_id, points_or_rank, game_score_type)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+        INSERT INTO scores(session_id, player_id, score, tournament_id, points_or_rank)
+        VALUES (?, ?, ?, ?, ?)
     """
     cursor.executemany(query, params)
+    cursor.executemany("""
+        UPDATE standings
+        SET total = total + ?2,
+            game_count = game_count + 1,
+            average = (total + ?2) / (game_count + 1)
+        WHERE player_id = ?1
+    """, [(score['player_id'], score['tournament_score']) for score in scores])
+    add_to_careers(connection, tournament_id, from_session_id=session_id)
+    update_ratings(connection, tournament_id, [(score['player_id'], score['game_score']) for score in scores])
+    bump_revision(connection, tournament_id)
+    return session_id
+
+
+def bump_revision(connection: sqlite3.Connection, tournament_id: int):
+    """Marks that the tournament's players or scores have changed, so anything cached for it is stale."""
+    connection.execute("UPDATE tournaments SET revision = revision + 1 WHERE id = ?;", (tournament_id,))
+
+
+def get_revision(connection: sqlite3.Connection, tournament_id: int) -> int | None:
+    cursor = connection.cursor()
+    cursor.execute("SELECT revision FROM tournaments WHERE id = ?;", (tournament_id,))
+    result = cursor.fetchone()
+    return None if result is None else result['revision']
 
 
 def get_scores(connection: sqlite3.Connection, tournament_id: int) -> list[tuple[Player, float, int, float]]:
     query = """
-    SELECT p.id, 
-        p.name, 
-        sum(coalesce(s.score, 0)) as total_score, 
-        coalesce(count(s.score_id), 0) as game_count, 
-        coalesce(sum(s.score)/count(s.score_id), 0) as average_score
-    FROM players as p
-    LEFT JOIN scores as s ON s.player_id = p.id
-    WHERE p.tournament_id = ?
-    GROUP BY p.id, p.name
-    ORDER BY average_score desc
+    SELECT p.id, p.name, st.total, st.game_count, st.average
+    FROM standings as st
+    JOIN players as p ON p.id = st.player_id
+    WHERE st.tournament_id = ?
+    ORDER BY st.average desc
     """
     cursor = connection.cursor()
     cursor.execute(query, (tournament_id,))
@@ -141,22 +361,474 @@ def get_scores(connection: sqlite3.Connection, tournament_id: int) -> list[tuple
     return results
 
 
-def get_all_records(connection: sqlite3.Connection, tournament_id: int) -> list[sqlite3.Row]:
+def get_scores_as_of(connection: sqlite3.Connection, tournament_id: int, as_of: datetime) -> list[tuple[Player, float, int, float]]:
+    """Gets the standings as they were at the given time, in the same shape as get_scores.
+
+    Only the scores of games recorded at or before as_of are counted. Players with no games by then are
+    included with no points.
+    """
     query = """
-        SELECT players.name, scores.* 
+    WITH totals AS (
+        SELECT s.player_id, sum(s.score) as total, count(*) as game_count
+        FROM game_sessions as g
+        JOIN scores as s ON s.tournament_id = g.tournament_id AND s.session_id = g.id
+        WHERE g.tournament_id = :tournament_id AND g.recorded_at <= :as_of
+        GROUP BY s.player_id
+    )
+    SELECT p.id, p.name,
+        coalesce(t.total, 0),
+        coalesce(t.game_count, 0),
+        coalesce(t.total / t.game_count, 0) as average
+    FROM players as p
+    LEFT JOIN totals as t ON t.player_id = p.id
+    WHERE p.tournament_id = :tournament_id
+    ORDER BY average desc
+    """
+    cursor = connection.cursor()
+    cursor.execute(query, {"tournament_id": tournament_id, "as_of": as_of.isoformat()})
+    return [(Player(id=row[0], name=row[1]), row[2], row[3], row[4]) for row in cursor]
+
+
+def iter_standings_history(connection: sqlite3.Connection, tournament_id: int, chunk_size: int = 1000) -> Iterator[sqlite3.Row]:
+    """Streams every score of the tournament in the order the games were played, along with the player's
+    running total and game count up to and including that game.
+
+    The running totals come from window functions, so the whole timeline takes one query over the scores.
+    """
+    query = """
+    SELECT g.id as session_id,
+        g.recorded_at,
+        g.game,
+        s.player_id,
+        sum(s.score) OVER played as total,
+        count(*) OVER played as game_count
+    FROM game_sessions as g
+    JOIN scores as s ON s.tournament_id = g.tournament_id AND s.session_id = g.id
+    WHERE g.tournament_id = ?
+    WINDOW played AS (PARTITION BY s.player_id ORDER BY g.recorded_at, g.id ROWS UNBOUNDED PRECEDING)
+    ORDER BY g.recorded_at, g.id
+    """
+    cursor = connection.cursor()
+    cursor.execute(query, (tournament_id,))
+    while rows := cursor.fetchmany(chunk_size):
+        yield from rows
+
+
+def get_all_records(connection: sqlite3.Connection, tournament_id: int) -> list[sqlite3.Row]:
+    return list(iter_records(connection, tournament_id))
+
+
+def iter_records(
+    connection: sqlite3.Connection,
+    tournament_id: int,
+    game: str = None,
+    player: str = None,
+    after_id: int = None,
+    limit: int = None,
+    offset: int = 0,
+    chunk_size: int = 1000,
+) -> Iterator[sqlite3.Row]:
+    """Streams a tournament's score records in the order they were recorded, chunk_size rows at a time.
+
+    The filters are applied in SQL. after_id is for keyset pagination: only the records after the score
+    with that id are returned, which (unlike offset) doesn't have to skip over the earlier rows.
+    """
+    conditions = ["scores.tournament_id = :tournament_id"]
+    if game is not None:
+        conditions.append("game_sessions.game = :game")
+    if player is not None:
+        conditions.append("players.name = :player")
+    if after_id is not None:
+        conditions.append("""
+            (scores.session_id, scores.score_id) > ((SELECT session_id FROM scores WHERE score_id = :after_id), :after_id)
+        """)
+
+    query = f"""
+        SELECT players.name,
+            scores.score_id,
+            scores.session_id,
+            game_sessions.game,
+            game_sessions.hours,
+            scores.player_id,
+            scores.score,
+            scores.points_or_rank,
+            game_sessions.score_type as game_score_type,
+            scores.tournament_id
         FROM scores
+        JOIN game_sessions ON scores.session_id = game_sessions.id
         JOIN players ON scores.player_id = players.id
-        WHERE players.tournament_id = ?;
+        WHERE {" AND ".join(conditions)}
+        ORDER BY scores.session_id, scores.score_id
+        LIMIT :limit OFFSET :offset;
     """
+    params = {
+        "tournament_id": tournament_id,
+        "game": game,
+        "player": player,
+        "after_id": after_id,
+        "limit": -1 if limit is None else limit,
+        "offset": offset,
+    }
     cursor = connection.cursor()
-    cursor.execute(query, (tournament_id,))
+    cursor.execute(query, params)
+    while rows := cursor.fetchmany(chunk_size):
+        yield from rows
+
+
+def get_sessions(connection: sqlite3.Connection, tournament_id: int) -> list[sqlite3.Row]:
+    """Gets the game sessions of a tournament, ordered by id."""
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT id, game, hours, score_type, recorded_at, fingerprint
+        FROM game_sessions
+        WHERE tournament_id = ?
+        ORDER BY id;
+    """, (tournament_id,))
     return cursor.fetchall()
 
 
-def update_scores(connection: sqlite3.Connection, scores: list[TourneyScore]):
-    query = """
-        UPDATE scores SET score = ? WHERE score_id = ?;
+def set_fingerprints(connection: sqlite3.Connection, fingerprints: dict[int, int]):
+    """Stores the fingerprints of the inputs that the given sessions (by id) were just scored with."""
+    connection.executemany(
+        "UPDATE game_sessions SET fingerprint = ? WHERE id = ?;",
+        [(session_fingerprint, session_id) for session_id, session_fingerprint in fingerprints.items()],
+    )
+
+
+def get_games(connection: sqlite3.Connection, tournament_id: int) -> list[sqlite3.Row]:
+    """Gets every game played in the tournament, most played first, with how many times it was played
+    and the hours and score type of its latest play.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT game, hours, score_type, plays
+        FROM (
+            SELECT game,
+                hours,
+                score_type,
+                count(*) OVER (PARTITION BY game) as plays,
+                row_number() OVER (PARTITION BY game ORDER BY recorded_at DESC, id DESC) as latest
+            FROM game_sessions
+            WHERE tournament_id = ?
+        )
+        WHERE latest = 1
+        ORDER BY plays DESC, game;
+    """, (tournament_id,))
+    return cursor.fetchall()
+
+
+def get_score_batch(connection: sqlite3.Connection, tournament_id: int, chunk_size: int = 5000) -> ScoreBatch:
+    """Loads every score of a tournament into a ScoreBatch, ordered by session.
+
+    This reads only the scores table (through the scores_by_session covering index), and streams the rows
+    as plain tuples straight into the batch's columns, so there's never a Row per score held in memory.
+    """
+    batch = ScoreBatch()
+    for rows in iter_score_chunks(connection, tournament_id, chunk_size):
+        batch.extend(rows)
+    return batch
+
+
+def iter_score_chunks(connection: sqlite3.Connection, tournament_id: int, chunk_size: int = 5000) -> Iterator[list[tuple]]:
+    """Streams a tournament's scores, ordered by session, as lists of up to chunk_size plain tuples of
+    (score_id, session_id, player_id, points_or_rank, score).
+    """
+    cursor = connection.cursor()
+    cursor.row_factory = None
+    cursor.execute("""
+        SELECT score_id, session_id, player_id, points_or_rank, score
+        FROM scores
+        WHERE tournament_id = ?
+        ORDER BY session_id, score_id;
+    """, (tournament_id,))
+    while rows := cursor.fetchmany(chunk_size):
+        yield rows
+
+
+def iter_session_chunks(connection: sqlite3.Connection, tournament_id: int, chunk_size: int = 5000) -> Iterator[list[tuple]]:
+    """Streams a tournament's game sessions, ordered by id, as lists of up to chunk_size plain tuples of
+    (id, game, hours, score_type, recorded_at).
+    """
+    cursor = connection.cursor()
+    cursor.row_factory = None
+    cursor.execute("""
+        SELECT id, game, hours, score_type, recorded_at
+        FROM game_sessions
+        WHERE tournament_id = ?
+        ORDER BY id;
+    """, (tournament_id,))
+    while rows := cursor.fetchmany(chunk_size):
+        yield rows
+
+
+def get_row_counts(connection: sqlite3.Connection, tournament_id: int) -> tuple[int, int]:
+    """Gets the number of (game sessions, scores) in a tournament."""
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT (SELECT count(*) FROM game_sessions WHERE tournament_id = :tournament_id),
+            (SELECT count(*) FROM scores WHERE tournament_id = :tournament_id);
+    """, {"tournament_id": tournament_id})
+    return tuple(cursor.fetchone())
+
+
+def get_next_session_id(connection: sqlite3.Connection) -> int:
+    cursor = connection.cursor()
+    cursor.execute("SELECT coalesce(max(id), 0) + 1 FROM game_sessions;")
+    return cursor.fetchone()[0]
+
+
+def bulk_insert_sessions(connection: sqlite3.Connection, tournament_id: int, sessions: Iterable[tuple[int, str, float, str, str]]):
+    """Inserts (id, game, hours, score_type, recorded_at) game sessions with the given ids.
+
+    Unlike record_scores, this leaves the standings and careers alone; call rebuild_standings and
+    add_to_careers once everything is in. The sessions aren't fingerprinted, so the next recalc
+    recalculates them.
+    """
+    connection.executemany("""
+        INSERT INTO game_sessions(id, tournament_id, game, hours, score_type, recorded_at)
+        VALUES (?1, ?6, ?2, ?3, ?4, ?5);
+    """, (session + (tournament_id,) for session in sessions))
+
+
+def bulk_insert_scores(connection: sqlite3.Connection, tournament_id: int, scores: Iterable[tuple[int, int, float, float]]):
+    """Inserts (session_id, player_id, points_or_rank, score) scores. Like bulk_insert_sessions, this
+    leaves the standings and careers alone.
+    """
+    connection.executemany("""
+        INSERT INTO scores(session_id, player_id, points_or_rank, score, tournament_id)
+        VALUES (?, ?, ?, ?, ?);
+    """, (score + (tournament_id,) for score in scores))
+
+
+def update_scores(connection: sqlite3.Connection, scores: Iterable[TourneyScore] | ScoreBatch) -> int:
+    """Updates the metascores of the given scores as one batch, returning how many rows actually changed.
+
+    The new scores are loaded into a temp table so that the standings and scores can each be updated with
+    a single statement. Rows whose metascore hasn't changed are never written.
+    """
+    if isinstance(scores, ScoreBatch):
+        new_scores = zip(scores.score_ids, scores.tournament_scores)
+    else:
+        new_scores = ((score['score_id'], score['tournament_score']) for score in scores)
+
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS updated_scores (
+            score_id INTEGER PRIMARY KEY,
+            score REAL NOT NULL
+        );
+    """)
+    cursor.execute("DELETE FROM temp.updated_scores;")
+    cursor.executemany(
+        "INSERT INTO temp.updated_scores(score_id, score) VALUES (?, ?);",
+        new_scores,
+    )
+    cursor.execute("""
+        DELETE FROM temp.updated_scores
+        WHERE score = (SELECT s.score FROM scores as s WHERE s.score_id = updated_scores.score_id);
+    """)
+    # This has to happen before the scores are updated, since it uses the old scores to get the change.
+    cursor.execute("""
+        UPDATE standings
+        SET total = standings.total + changes.difference,
+            average = coalesce((standings.total + changes.difference) / nullif(standings.game_count, 0), 0)
+        FROM (
+            SELECT s.player_id, sum(u.score - s.score) as difference
+            FROM temp.updated_scores as u
+            JOIN scores as s ON s.score_id = u.score_id
+            GROUP BY s.player_id
+        ) as changes
+        WHERE standings.player_id = changes.player_id;
+    """)
+    # Changed scores can change who won, so the changed sessions are taken out of the careers and put back
+    _adjust_careers(cursor, [UPDATED_SESSIONS], {}, sign=-1)
+    cursor.execute("""
+        UPDATE scores SET score = u.score
+        FROM temp.updated_scores as u
+        WHERE scores.score_id = u.score_id;
+    """)
+    changed = cursor.rowcount
+    _adjust_careers(cursor, [UPDATED_SESSIONS], {}, sign=1)
+    cursor.execute("""
+        UPDATE tournaments SET revision = revision + 1
+        WHERE id IN (
+            SELECT DISTINCT s.tournament_id
+            FROM temp.updated_scores as u
+            JOIN scores as s ON s.score_id = u.score_id
+        );
+    """)
+    cursor.execute("DELETE FROM temp.updated_scores;")
+    return changed
+
+
+def add_to_careers(connection: sqlite3.Connection, tournament_id: int = None, from_session_id: int = None):
+    """Adds the scores of a tournament's game sessions (or of every tournament) to the careers table.
+
+    With from_session_id, only the sessions from that id on are added, such as the one just recorded.
+    """
+    conditions = []
+    if tournament_id is not None:
+        conditions.append("g.tournament_id = :tournament_id")
+    if from_session_id is not None:
+        conditions.append("s.session_id >= :from_session_id")
+    params = {"tournament_id": tournament_id, "from_session_id": from_session_id}
+    _adjust_careers(connection.cursor(), conditions, params, sign=1)
+
+
+def rebuild_careers(connection: sqlite3.Connection):
+    """Recomputes every person's career totals from the scores table."""
+    cursor = connection.cursor()
+    create_careers_table(cursor)
+    cursor.execute("DELETE FROM careers;")
+    add_to_careers(connection)
+
+
+# The sessions with a score in temp.updated_scores, as a condition for _adjust_careers
+UPDATED_SESSIONS = "g.id IN (SELECT s.session_id FROM temp.updated_scores as u JOIN scores as s ON s.score_id = u.score_id)"
+
+
+def _adjust_careers(cursor: sqlite3.Cursor, conditions: list[str], params: dict, sign: int):
+    """Adds (sign=1) or takes away (sign=-1) the scores of the game sessions matching the conditions to
+    or from the careers table. The winners of a session are whoever got its highest metascore.
     """
+    cursor.execute(f"""
+        INSERT INTO careers(person_id, game, games_played, total, wins)
+        SELECT person_id, game, :sign * count(*), :sign * sum(score), :sign * sum(score = best)
+        FROM (
+            SELECT p.person_id, g.game, s.score, max(s.score) OVER (PARTITION BY s.session_id) as best
+            FROM game_sessions as g
+            JOIN scores as s ON s.tournament_id = g.tournament_id AND s.session_id = g.id
+            JOIN players as p ON p.id = s.player_id
+            WHERE {" AND ".join(["p.person_id IS NOT NULL", *conditions])}
+        )
+        WHERE true
+        GROUP BY person_id, game
+        ON CONFLICT (person_id, game) DO UPDATE SET
+            games_played = games_played + excluded.games_played,
+            total = total + excluded.total,
+            wins = wins + excluded.wins;
+    """, dict(params, sign=sign))
+
+
+def get_people(connection: sqlite3.Connection) -> list[str]:
+    """Gets the names of everyone who has played in any tournament."""
     cursor = connection.cursor()
-    for score in scores:
-        cursor.execute(query, [score['tournament_score'], score['score_id']])
\ No newline at end of file
+    cursor.execute("SELECT name FROM people ORDER BY name;")
+    return [row['name'] for row in cursor]
+
+
+def get_career(connection: sqlite3.Connection, name: str) -> tuple[sqlite3.Row | None, list[sqlite3.Row]]:
+    """Gets a person (matched by name, ignoring case) along with their career totals for each game."""
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT people.id, people.name, (SELECT count(*) FROM players WHERE person_id = people.id) as tournaments
+        FROM people
+        WHERE name = ?;
+    """, (name.strip(),))
+    person = cursor.fetchone()
+    if person is None:
+        return None, []
+    cursor.execute("""
+        SELECT game, games_played, total, wins, total / games_played as average
+        FROM careers
+        WHERE person_id = ? AND games_played > 0
+        ORDER BY games_played DESC, game;
+    """, (person['id'],))
+    return person, cursor.fetchall()
+
+
+def update_ratings(connection: sqlite3.Connection, tournament_id: int, results: list[tuple[int, float]]):
+    """Rates one game from its (player_id, points or inverse rank) pairs, only reading and writing the
+    ratings of the players in it.
+    """
+    cursor = connection.cursor()
+    player_ids = [player_id for player_id, _ in results]
+    cursor.execute(
+        f"SELECT player_id, rating, game_count FROM ratings WHERE player_id IN ({', '.join('?' * len(player_ids))});",
+        player_ids,
+    )
+    engine = ratings.RatingEngine()
+    for row in cursor:
+        engine.ratings[row['player_id']] = row['rating']
+        engine.games[row['player_id']] = row['game_count']
+    engine.play(results)
+    _save_ratings(cursor, tournament_id, engine, player_ids)
+
+
+def rebuild_ratings(connection: sqlite3.Connection, tournament_id: int = None, chunk_size: int = 5000):
+    """Recomputes the ratings of every tournament (or only the given one) by replaying their games in the
+    order they were played.
+
+    The scores are streamed from one ordered query, so only the current ratings are held in memory.
+    """
+    params = {"tournament_id": tournament_id}
+    cursor = connection.cursor()
+    create_ratings_table(cursor)
+    cursor.execute("DELETE FROM ratings WHERE :tournament_id IS NULL OR tournament_id = :tournament_id;", params)
+
+    scores = connection.cursor()
+    scores.row_factory = None
+    scores.execute("""
+        SELECT g.tournament_id, g.id, s.player_id, s.points_or_rank
+        FROM game_sessions as g
+        JOIN scores as s ON s.tournament_id = g.tournament_id AND s.session_id = g.id
+        WHERE :tournament_id IS NULL OR g.tournament_id = :tournament_id
+        ORDER BY g.tournament_id, g.recorded_at, g.id
+    """, params)
+    rows = itertools.chain.from_iterable(iter(lambda: scores.fetchmany(chunk_size), []))
+
+    # Every tournament's players are separate, so each one is saved as soon as its games have been played
+    for tournament_id, tournament_rows in itertools.groupby(rows, key=operator.itemgetter(0)):
+        engine = ratings.RatingEngine()
+        for _, session_rows in itertools.groupby(tournament_rows, key=operator.itemgetter(1)):
+            engine.play((player_id, result) for _, _, player_id, result in session_rows)
+        _save_ratings(cursor, tournament_id, engine, engine.ratings)
+
+
+def _save_ratings(cursor: sqlite3.Cursor, tournament_id: int, engine: ratings.RatingEngine, player_ids: Iterable[int]):
+    cursor.executemany("""
+        INSERT INTO ratings(player_id, tournament_id, rating, game_count)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (player_id) DO UPDATE SET
+            rating = excluded.rating,
+            game_count = excluded.game_count;
+    """, [(player_id, tournament_id, engine.ratings[player_id], engine.games[player_id]) for player_id in player_ids])
+
+
+def get_ratings(connection: sqlite3.Connection, tournament_id: int) -> list[tuple[Player, float, int]]:
+    """Gets every player's (player, rating, games rated), best first. Players who haven't played yet have
+    the starting rating.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT p.id, p.name, coalesce(r.rating, ?) as rating, coalesce(r.game_count, 0) as game_count
+        FROM players as p
+        LEFT JOIN ratings as r ON r.player_id = p.id
+        WHERE p.tournament_id = ?
+        ORDER BY rating DESC, p.name
+    """, (ratings.DEFAULT_RATING, tournament_id))
+    return [(Player(id=row['id'], name=row['name']), row['rating'], row['game_count']) for row in cursor]
+
+
+def rebuild_standings(connection: sqlite3.Connection, tournament_id: int = None):
+    """Recomputes the standings of every tournament (or only the given one) from the scores table."""
+    params = {"tournament_id": tournament_id}
+    cursor = connection.cursor()
+    create_standings_table(cursor)
+    cursor.execute("DELETE FROM standings WHERE :tournament_id IS NULL OR tournament_id = :tournament_id;", params)
+    cursor.execute("""
+        INSERT INTO standings(player_id, tournament_id, total, game_count, average)
+        SELECT p.id,
+            p.tournament_id,
+            sum(coalesce(s.score, 0)),
+            count(s.score_id),
+            coalesce(sum(s.score)/count(s.score_id), 0)
+        FROM players as p
+        LEFT JOIN scores as s ON s.player_id = p.id
+        WHERE :tournament_id IS NULL OR p.tournament_id = :tournament_id
+        GROUP BY p.id
+    """, params)
+    cursor.execute("""
+        UPDATE tournaments SET revision = revision + 1
+        WHERE :tournament_id IS NULL OR id = :tournament_id;
+    """, params)
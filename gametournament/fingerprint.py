@@ -0,0 +1,55 @@
+"""Fingerprints of the inputs that a game session's metascores are calculated from.
+
+A fingerprint covers the tournament's multipliers and bonus flag, the session's hours and score type, and
+every player's raw score, so two sessions with the same fingerprint always get the same metascores.
+Each session stores the fingerprint of the inputs it was last scored with, which lets recalc skip the
+sessions whose fingerprint hasn't changed.
+"""
+import hashlib
+import itertools
+import operator
+import sqlite3
+from typing import Iterable, Sequence
+
+from gametournament.models import Tournament
+from gametournament.score_batch import ScoreBatch
+
+# Bump this whenever the formulae change, so every session is recalculated
+FORMULA_VERSION = 1
+
+
+def session_fingerprint(tournament: Tournament, hours: float, score_type: str, results: Iterable[tuple[int, float]]) -> int:
+    """Fingerprints one session from its (player_id, points or inverse rank) results, as a signed 64-bit int.
+
+    Numbers are compared as floats, so a score of 5 read back from the db matches the 5.0 it was recorded as.
+    """
+    results = sorted((int(player_id), float(score)) for player_id, score in results)
+    return _fingerprint(_settings(tournament), float(hours), score_type, results)
+
+
+def batch_fingerprints(tournament: Tournament, batch: ScoreBatch, sessions: Sequence[sqlite3.Row]) -> dict[int, int]:
+    """Fingerprints every session of a batch, keyed by session id."""
+    settings = _settings(tournament)
+    session_lookup = {session['id']: (float(session['hours']), session['score_type']) for session in sessions}
+    # The batch's columns are already ints and floats, so sorting them all at once gives each session's
+    # results in the same order as session_fingerprint
+    rows = sorted(zip(batch.session_ids, batch.player_ids, batch.game_scores))
+    fingerprints = {}
+    for session_id, session_rows in itertools.groupby(rows, key=operator.itemgetter(0)):
+        hours, score_type = session_lookup[session_id]
+        fingerprints[session_id] = _fingerprint(settings, hours, score_type, [row[1:] for row in session_rows])
+    return fingerprints
+
+
+def _settings(tournament: Tournament) -> tuple:
+    return (
+        FORMULA_VERSION,
+        float(tournament['rank_multiplier']),
+        float(tournament['duration_multiplier']),
+        bool(tournament['apply_bonus_or_penalty']),
+    )
+
+
+def _fingerprint(settings: tuple, hours: float, score_type: str, results: list[tuple[int, float]]) -> int:
+    digest = hashlib.blake2b(repr((settings, hours, score_type, results)).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, signed=True)
@@ -16,9 +16,11 @@ class FormulaNode:
 
 
 class FormulaOp(FormulaNode):
-    def __init__(self, text: str, op_func: Callable[[float, float], float]):
+    def __init__(self, text: str, op_func: Callable[[float, float], float], symbol: str = None):
         super().__init__(text)
         self.op_func = op_func
+        # The python operator this op compiles to. Ops without one are compiled to a call to op_func.
+        self.symbol = symbol
 
 
 class FormulaValue(FormulaNode):
@@ -147,11 +149,73 @@ class Expression:
             if isinstance(node, (Expression, FormulaValue)):
                 node.reset()
 
+    @property
+    def is_constant(self) -> bool:
+        """Whether every value in this expression (and its sub-expressions) is immutable."""
+        for node in self.nodes:
+            match node:
+                case FormulaValue() if not node.is_immutable:
+                    return False
+                case Expression() if not node.is_constant:
+                    return False
+        return True
+
+    def compile(self, *variables: FormulaValue) -> Callable[..., float]:
+        """Compiles this expression into a single python function.
+
+        The returned function takes one positional argument per variable, in the order they're passed
+        here. Immutable values (and any sub-expression made only of immutable values) are folded into
+        constants, so calling the function does no tree-walking at all.
+        """
+        arg_names = [f"_v{i}" for i in range(len(variables))]
+        namespace = {}
+        source = self._source(list(zip(variables, arg_names)), namespace)
+        return eval(f"lambda {', '.join(arg_names)}: {source}", {"__builtins__": {}, **namespace})
+
+    def _source(self, arguments: list[tuple[FormulaValue, str]], namespace: dict) -> str:
+        if self.is_constant:
+            return self._constant(self.compute(), namespace)
+
+        current_source = "0"
+        current_op: FormulaOp | None = None
+        for node in self.nodes:
+            match node:
+                case FormulaValue(text) if not node.is_immutable:
+                    node_source = next((name for value, name in arguments if value is node), None)
+                    if node_source is None:
+                        raise ValueError(f"Cannot compile expression; '{text}' was not passed as a variable")
+                case FormulaValue(_, value):
+                    node_source = self._constant(value, namespace)
+                case Expression():
+                    node_source = node._source(arguments, namespace)
+                case FormulaOp():
+                    current_op = node
+                    continue
+                case _:
+                    raise TypeError("Unexpected node type!")
+
+            if current_op is None:
+                current_source = node_source
+            elif current_op.symbol is not None:
+                current_source = f"({current_source} {current_op.symbol} {node_source})"
+            else:
+                op_name = f"_op{len(namespace)}"
+                namespace[op_name] = current_op.op_func
+                current_source = f"{op_name}({current_source}, {node_source})"
+            current_op = None
+        return current_source
 
-Add = FormulaOp("+", lambda x, y: x + y)
-Subtract = FormulaOp("-", lambda x, y: x - y)
-Multiply = FormulaOp("x", lambda x, y: x * y)
-Divide = FormulaOp("÷", lambda x, y: x / y)
+    @staticmethod
+    def _constant(value, namespace: dict) -> str:
+        name = f"_c{len(namespace)}"
+        namespace[name] = value
+        return name
+
+
+Add = FormulaOp("+", lambda x, y: x + y, "+")
+Subtract = FormulaOp("-", lambda x, y: x - y, "-")
+Multiply = FormulaOp("x", lambda x, y: x * y, "*")
+Divide = FormulaOp("÷", lambda x, y: x / y, "/")
 
 
 class Formula(ABC):
@@ -162,16 +226,36 @@ class Formula(ABC):
         self.duration_multiplier = FormulaValue("Duration Multiplier", tournament['duration_multiplier'])
         self.duration = FormulaValue("Game Hours", duration)
         self._expression = Expression()
+        self._compiled: Callable[..., float] | None = None
 
     @property
     def expression(self) -> Expression:
         return self._expression
 
+    @property
+    @abstractmethod
+    def variables(self) -> tuple[FormulaValue, ...]:
+        """Implement this to return the mutable expression nodes, in the order get_values returns them"""
+
     @abstractmethod
+    def get_values(self, inverse_rank: int, all_scores: list[float], this_score: float) -> tuple[float, ...]:
+        """Implement this to calculate the values of the various expression nodes"""
+
     def set_values(self, inverse_rank: int, all_scores: list[float], this_score: float):
-        """Implement this to set up the various expression node values"""
+        for variable, value in zip(self.variables, self.get_values(inverse_rank, all_scores, this_score)):
+            variable.set(value)
+
+    def compile(self) -> Callable[..., float]:
+        """Gets the compiled expression, taking the values of self.variables as positional arguments."""
+        if self._compiled is None:
+            self._compiled = self.expression.compile(*self.variables)
+        return self._compiled
 
     def compute(self, inverse_rank: int, all_scores: list[float], this_score: float) -> float:
+        return self.compile()(*self.get_values(inverse_rank, all_scores, this_score))
+
+    def interpret(self, inverse_rank: int, all_scores: list[float], this_score: float) -> float:
+        """Computes the value by walking the expression tree. This is slow; prefer compute."""
         self.reset()
         self.set_values(inverse_rank, all_scores, this_score)
         return self.expression.compute()
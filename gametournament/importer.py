@@ -0,0 +1,131 @@
+import csv
+import json
+import math
+import sqlite3
+from datetime import datetime
+from typing import Iterable, Iterator, TextIO, TypedDict, Literal
+
+from gametournament import db
+from gametournament.models import Tournament, Player
+from gametournament.point_scorer import PointScorer
+from gametournament.rank_scorer import RankScorer, are_valid_ranks
+
+RESULT_FIELDS = ("game", "hours", "type", "player", "score")
+
+
+class ResultsFileError(ValueError):
+    """Raised when a row of a results file can't be imported"""
+
+
+class ImportedGame(TypedDict):
+    game: str
+    hours: float
+    score_type: Literal['points', 'rank']
+    recorded_at: datetime | None
+    results: list[tuple[str, float]]
+
+
+def read_rows(file: TextIO, file_format: Literal['csv', 'jsonl']) -> Iterator[dict]:
+    """Streams the rows of a CSV (with a header row) or JSONL results file as dicts."""
+    if file_format == 'csv':
+        yield from csv.DictReader(file)
+        return
+
+    for line_number, line in enumerate(file, start=1):
+        if line.strip() == "":
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ResultsFileError(f"Line {line_number} is not valid JSON: {e}") from e
+
+
+def group_games(rows: Iterable[dict]) -> Iterator[ImportedGame]:
+    """Groups consecutive result rows into games.
+
+    A new game starts whenever the game, hours, type (or the optional session or recorded_at columns)
+    change, or when a player shows up a second time, so back-to-back plays of the same game are kept
+    apart. Only the rows of the current game are ever held in memory.
+    """
+    current: ImportedGame | None = None
+    current_key = None
+    current_players = set()
+    for row_number, row in enumerate(rows, start=1):
+        missing = [field for field in RESULT_FIELDS if row.get(field) in (None, "")]
+        if missing:
+            raise ResultsFileError(f"Row {row_number} is missing {', '.join(missing)}")
+
+        score_type = str(row['type']).strip().lower()
+        if score_type not in ('points', 'rank'):
+            raise ResultsFileError(f"Row {row_number} has type '{row['type']}'; it must be 'points' or 'rank'")
+        try:
+            hours = float(row['hours'])
+            score = float(row['score'])
+        except ValueError as e:
+            raise ResultsFileError(f"Row {row_number} has an invalid number: {e}") from e
+        if not math.isfinite(hours) or not math.isfinite(score):
+            raise ResultsFileError(f"Row {row_number} has hours of {row['hours']} and a score of {row['score']}; both must be finite")
+        if hours <= 0:
+            raise ResultsFileError(f"Row {row_number} has hours of {row['hours']}; they must be more than 0")
+        try:
+            recorded_at = datetime.fromisoformat(str(row['recorded_at'])) if row.get('recorded_at') else None
+        except ValueError as e:
+            raise ResultsFileError(f"Row {row_number} has an invalid recorded_at time: {e}") from e
+
+        player = str(row['player']).strip()
+        key = (row.get('session'), str(row['game']).strip(), hours, score_type, recorded_at)
+        if key != current_key or player in current_players:
+            if current is not None:
+                yield current
+            current = ImportedGame(game=key[1], hours=hours, score_type=score_type, recorded_at=recorded_at, results=[])
+            current_key = key
+            current_players = set()
+
+        current['results'].append((player, score))
+        current_players.add(player)
+
+    if current is not None:
+        yield current
+
+
+def import_games(
+    connection: sqlite3.Connection,
+    tournament: Tournament,
+    games: Iterable[ImportedGame],
+    batch_size: int = 500,
+    add_players: bool = True,
+) -> tuple[int, int]:
+    """Scores and records each game, committing every batch_size games. Returns (games, scores) imported."""
+    players: dict[str, Player] = {player['name']: player for player in db.get_players(connection, tournament['id'])}
+    game_count = score_count = 0
+    for game in games:
+        new_players = sorted({name for name, _ in game['results'] if name not in players})
+        if new_players and not add_players:
+            raise ResultsFileError(f"{', '.join(new_players)} isn't a player in {tournament['name']}")
+        if new_players:
+            db.insert_players(connection, tournament['id'], new_players)
+            players = {player['name']: player for player in db.get_players(connection, tournament['id'])}
+
+        game_players = [players[name] for name, _ in game['results']]
+        if game['score_type'] == 'points':
+            scorer = PointScorer(tournament, game_players, game['hours'])
+            raw_scores = [(players[name]['id'], score) for name, score in game['results']]
+        else:
+            ranks = [score for _, score in game['results']]
+            if not are_valid_ranks(ranks):
+                raise ResultsFileError(
+                    f"Game {game_count + 1} ({game['game']}) has ranks {', '.join(f'{rank:g}' for rank in ranks)}; "
+                    f"they must be whole numbers from 1 to {len(ranks)}"
+                )
+            scorer = RankScorer(tournament, game_players, game['hours'])
+            raw_scores = [(players[name]['id'], int(score)) for name, score in game['results']]
+        scores = scorer.score_raw(raw_scores)
+        db.record_scores(connection, tournament['id'], game['game'], game['hours'], scores.values(), game['recorded_at'])
+
+        game_count += 1
+        score_count += len(scores)
+        if game_count % batch_size == 0:
+            connection.commit()
+
+    connection.commit()
+    return game_count, score_count
@@ -1,4 +1,5 @@
-import statistics
+import math
+from typing import Iterable, Self
 
 import click
 
@@ -16,13 +17,16 @@ class PointScorer(BaseScorer):
             (player['id'], click.prompt(f"What was the score for player {player['name']}?", type=int))
             for player in self.players
         ]
-        sorted_scores = sorted(scores, key=lambda x: x[1], reverse=True)
+        return self.score_raw(scores)
+
+    def score_raw(self, raw_scores: list[tuple[int, float]]) -> dict[int, TourneyScore]:
+        sorted_scores = sorted(raw_scores, key=lambda x: x[1], reverse=True)
         return self.calculate(sorted_scores)
 
     def calculate(self, scores: list[tuple[int, float]]) -> dict[int, TourneyScore]:
         player_scores = {}
         current_inverse_rank = len(scores) + 1
-        game_scores = [s[1] for s in scores]
+        game_stats = GameStats.of(s[1] for s in scores)
         last_score = None
         last_points = None
         for player_id, points in scores:
@@ -31,17 +35,60 @@ class PointScorer(BaseScorer):
                 player_scores[player_id] = TourneyScore(
                     player_id=player_id,
                     tournament_score=last_score,
-                    game_score=int(points),
+                    game_score=points,
                     game_score_type='points'
                 )
                 continue
 
             last_points = points
-            last_score = self.make_metascore(current_inverse_rank, game_scores, points)
+            last_score = self.make_metascore(current_inverse_rank, game_stats, points)
             player_scores[player_id] = TourneyScore(player_id=player_id, tournament_score=last_score, game_score=points, game_score_type='points')
         return player_scores
 
 
+class GameStats:
+    """The mean and sample standard deviation of one game's scores, accumulated in a single pass with
+    Welford's algorithm. Compute this once per game and share it across every player's metascore.
+    """
+    __slots__ = ("count", "mean", "_sum_of_squares")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._sum_of_squares = 0.0
+
+    @classmethod
+    def of(cls, scores: Iterable[float]) -> Self:
+        stats = cls()
+        for score in scores:
+            stats.add(score)
+        return stats
+
+    def add(self, score: float):
+        self.count += 1
+        delta = score - self.mean
+        self.mean += delta / self.count
+        self._sum_of_squares += delta * (score - self.mean)
+
+    @property
+    def stdev(self) -> float:
+        """The sample standard deviation, which is 0 for fewer than two scores."""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self._sum_of_squares / (self.count - 1))
+
+    def deviations_from_mean(self, score: float) -> float:
+        """How many standard deviations score is above (or below) the mean.
+
+        With a single player, or when every player tied, there's no spread to measure, so this is 0: no
+        bonus or penalty.
+        """
+        stdev = self.stdev
+        if stdev == 0:
+            return 0.0
+        return (score - self.mean) / stdev
+
+
 class PointFormula(Formula):
     def __init__(self, tournament: Tournament, duration: float):
         super().__init__(tournament, duration)
@@ -52,9 +99,13 @@ class PointFormula(Formula):
         if self.tournament['apply_bonus_or_penalty']:
             self._expression += self._standard_deviations_from_mean
 
-    def set_values(self, inverse_rank: int, all_scores: list[float], this_score: float):
-        self._inverse_rank.set(inverse_rank)
-        std = statistics.stdev(all_scores)
-        mean = statistics.mean(all_scores)
-        dist_from_mean = this_score - mean
-        self._standard_deviations_from_mean.set(dist_from_mean / std)
+    @property
+    def variables(self) -> tuple[FormulaValue, ...]:
+        return self._inverse_rank, self._standard_deviations_from_mean
+
+    def get_values(self, inverse_rank: int, all_scores: list[float] | GameStats, this_score: float) -> tuple[float, ...]:
+        """all_scores can be the game's precomputed GameStats, which saves going over every score again"""
+        if not isinstance(all_scores, GameStats):
+            all_scores = GameStats.of(all_scores)
+        return inverse_rank, all_scores.deviations_from_mean(this_score)
+
@@ -0,0 +1,164 @@
+"""Opt-in instrumentation for diagnosing slow commands, turned on with the global --profile option.
+
+While installed, the Profiler wraps every function in the db module, the scorers' calculate/recalculate
+methods and Formula.compute with timing spans. It also traces the SQL run on every connection from
+db.get_connection, and flags the db calls that took longer than the slow threshold, along with the
+statements they ran.
+"""
+import cProfile
+import functools
+import inspect
+import json
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict, Counter
+from pathlib import Path
+from typing import Callable, TextIO
+
+MAX_SLOW_CALLS = 50
+
+
+class Profiler:
+    def __init__(self, slow_ms: float = 50.0, use_cprofile: bool = False):
+        self.slow_ms = slow_ms
+        self.durations: dict[str, list[float]] = defaultdict(list)
+        self.statements: Counter[str] = Counter()
+        self.slow_calls: list[dict] = []
+        self.cprofile = cProfile.Profile() if use_cprofile else None
+        self._patches: list[tuple[object, str, object]] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started = None
+
+    def install(self):
+        from gametournament import db
+        from gametournament.base_scorer import BaseScorer
+        from gametournament.batch_scorer import BatchScorer
+        from gametournament.formula import Formula
+        from gametournament.point_scorer import PointScorer
+        from gametournament.rank_scorer import RankScorer
+
+        for name, func in vars(db).items():
+            if inspect.isfunction(func) and func.__module__ == db.__name__:
+                self._patch(db, name, self._timed(f"db.{name}", func))
+        self._patch(db, "get_connection", self._traced(db.get_connection))
+
+        for cls, method in [
+            (BaseScorer, "recalculate"),
+            (PointScorer, "calculate"),
+            (RankScorer, "calculate"),
+            (BatchScorer, "compute_metascores"),
+            (Formula, "compute"),
+        ]:
+            self._patch(cls, method, self._timed(f"{cls.__name__}.{method}", getattr(cls, method)))
+
+        self._started = time.perf_counter()
+        if self.cprofile is not None:
+            self.cprofile.enable()
+
+    def uninstall(self):
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        for owner, name, original in reversed(self._patches):
+            setattr(owner, name, original)
+        self._patches.clear()
+
+    def report(self) -> dict:
+        with self._lock:
+            spans = {
+                name: {
+                    "calls": len(durations),
+                    "total_ms": sum(durations),
+                    "mean_ms": statistics.fmean(durations),
+                    "max_ms": max(durations),
+                }
+                for name, durations in self.durations.items()
+            }
+            return {
+                "wall_ms": (time.perf_counter() - self._started) * 1000 if self._started else 0,
+                "spans": dict(sorted(spans.items(), key=lambda item: item[1]["total_ms"], reverse=True)),
+                "sql": {
+                    "statements": sum(self.statements.values()),
+                    "most_common": [
+                        {"statement": statement, "count": count}
+                        for statement, count in self.statements.most_common(20)
+                    ],
+                },
+                "slow_calls": list(self.slow_calls),
+            }
+
+    def write_report(self, output: Path = None, cprofile_output: Path = None, stream: TextIO = sys.stderr):
+        """Writes the JSON report to output, or a summary to stream if there's no output file."""
+        report = self.report()
+        if cprofile_output is not None and self.cprofile is not None:
+            self.cprofile.dump_stats(cprofile_output)
+        if output is not None:
+            output.write_text(json.dumps(report, indent=2))
+            return
+
+        stream.write(f"\n{'-' * 20}\nProfile ({report['wall_ms']:.1f}ms wall, {report['sql']['statements']} SQL statements):\n")
+        for name, span in report["spans"].items():
+            stream.write(f"{span['total_ms']:>10.2f}ms {span['calls']:>8} calls  {name}\n")
+        for slow_call in report["slow_calls"]:
+            stream.write(f"SLOW: {slow_call['span']} took {slow_call['ms']:.1f}ms ({len(slow_call['statements'])} statements)\n")
+
+    def _patch(self, owner: object, name: str, replacement: object):
+        self._patches.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    def _timed(self, span_name: str, func: Callable) -> Callable:
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                # Generators do their work while being iterated, so that's what gets timed
+                with self._span(span_name):
+                    yield from func(*args, **kwargs)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self._span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def _traced(self, get_connection: Callable[..., sqlite3.Connection]) -> Callable[..., sqlite3.Connection]:
+        @functools.wraps(get_connection)
+        def wrapper(*args, **kwargs):
+            connection = get_connection(*args, **kwargs)
+            connection.set_trace_callback(self._on_statement)
+            return connection
+        return wrapper
+
+    def _on_statement(self, statement: str):
+        statement = " ".join(statement.split())
+        with self._lock:
+            self.statements[statement[:200]] += 1
+        for span_statements in getattr(self._local, "stack", []):
+            span_statements.append(statement)
+
+    def _span(self, name: str):
+        return _Span(self, name)
+
+
+class _Span:
+    """Times one call, collecting the SQL statements it runs (including those of nested spans)."""
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+        self.statements: list[str] = []
+
+    def __enter__(self):
+        self.profiler._local.__dict__.setdefault("stack", []).append(self.statements)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        self.profiler._local.stack.pop()
+        with self.profiler._lock:
+            self.profiler.durations[self.name].append(elapsed_ms)
+            is_slow = self.name.startswith("db.") and elapsed_ms > self.profiler.slow_ms
+            if is_slow and len(self.profiler.slow_calls) < MAX_SLOW_CALLS:
+                self.profiler.slow_calls.append({"span": self.name, "ms": elapsed_ms, "statements": self.statements[:20]})
@@ -1,4 +1,5 @@
 from collections import defaultdict
+from typing import Collection
 
 import click
 
@@ -7,6 +8,11 @@ from gametournament.formula import Formula, FormulaValue
 from gametournament.models import TourneyScore, Tournament, Player
 
 
+def are_valid_ranks(ranks: Collection[float]) -> bool:
+    """Whether every rank is a whole number from 1 to the number of ranks (ties share a rank)"""
+    return all(float(rank).is_integer() and 1 <= rank <= len(ranks) for rank in ranks)
+
+
 class RankScorer(BaseScorer):
     def __init__(self, tournament: Tournament, players: list[Player], game_hours: float):
         super().__init__(tournament, players, RankFormula(tournament, game_hours))
@@ -22,7 +28,10 @@ class RankScorer(BaseScorer):
                 type=click.Choice(ranks_available),
             )
             ranks.append((player['id'], int(rank)))
-        inverse_ranks = self.invert_ranks(ranks)
+        return self.score_raw(ranks)
+
+    def score_raw(self, raw_scores: list[tuple[int, int]]) -> dict[int, TourneyScore]:
+        inverse_ranks = self.invert_ranks(raw_scores)
         normalized_ranks = self.normalize_ranks(inverse_ranks)
         return self.calculate(normalized_ranks)
 
@@ -81,5 +90,9 @@ class RankFormula(Formula):
 
         self.expression.set(self._inverse_rank * self.rank_multiplier * (self.duration_multiplier * self.duration))
 
-    def set_values(self, inverse_rank: int, all_scores: list[float], this_score: float):
-        self._inverse_rank.set(inverse_rank)
\ No newline at end of file
+    @property
+    def variables(self) -> tuple[FormulaValue, ...]:
+        return self._inverse_rank,
+
+    def get_values(self, inverse_rank: int, all_scores: list[float], this_score: float) -> tuple[float, ...]:
+        return inverse_rank,
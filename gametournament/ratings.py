@@ -0,0 +1,55 @@
+"""Elo-style skill ratings, which (unlike the metascore averages) take the strength of the opposition into
+account.
+
+A game is treated as one match between each player and the rest of the table: a player's expected
+result comes from the gap between their rating and the average rating of their opponents, and their
+actual result is the share of their opponents they beat (ties counting as half). Ratings only move for
+the players of the game, so rating a game costs time in proportion to the number of players in it.
+
+Results are the recorded points or (inverse) ranks, where higher is always better, rather than the
+metascores, so recalculating the metascores never changes the ratings.
+"""
+import bisect
+from typing import Iterable
+
+DEFAULT_RATING = 1500.0
+# How far a single game can move a rating
+K_FACTOR = 32.0
+# A rating gap of this many points means the stronger player is expected to do 10 times as well
+SCALE = 400.0
+
+
+def rate_game(ratings: list[float], results: list[float], k_factor: float = K_FACTOR) -> list[float]:
+    """Returns the new ratings of the players of one game, given their ratings and results going in."""
+    players = len(ratings)
+    if players < 2:
+        return list(ratings)
+
+    total = sum(ratings)
+    sorted_results = sorted(results)
+    new_ratings = []
+    for rating, result in zip(ratings, results):
+        beaten = bisect.bisect_left(sorted_results, result)
+        tied = bisect.bisect_right(sorted_results, result) - beaten - 1
+        actual = (beaten + tied / 2) / (players - 1)
+        opponents = (total - rating) / (players - 1)
+        expected = 1 / (1 + 10 ** ((opponents - rating) / SCALE))
+        new_ratings.append(rating + k_factor * (actual - expected))
+    return new_ratings
+
+
+class RatingEngine:
+    """Holds the current rating and number of games of every player seen so far, for replaying a score log."""
+    __slots__ = ("ratings", "games")
+
+    def __init__(self):
+        self.ratings: dict[int, float] = {}
+        self.games: dict[int, int] = {}
+
+    def play(self, results: Iterable[tuple[int, float]]):
+        """Rates one game from its (player_id, result) pairs."""
+        player_ids, game_results = zip(*results)
+        new_ratings = rate_game([self.ratings.get(player_id, DEFAULT_RATING) for player_id in player_ids], game_results)
+        for player_id, rating in zip(player_ids, new_ratings):
+            self.ratings[player_id] = rating
+            self.games[player_id] = self.games.get(player_id, 0) + 1
@@ -0,0 +1,97 @@
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import NamedTuple, Iterator
+
+import numpy as np
+
+from gametournament import db, fingerprint
+from gametournament.batch_scorer import BatchScorer
+from gametournament.models import Tournament, TourneyScore
+
+
+class ScoreChange(NamedTuple):
+    score_id: int
+    session_id: int
+    game: str
+    player_name: str
+    old_score: float
+    new_score: float
+
+
+class Recalculation(NamedTuple):
+    changes: list[ScoreChange]
+    # The new fingerprints of the sessions that were recalculated, whether or not any of their scores changed
+    fingerprints: dict[int, int]
+
+
+def find_changes(connection: sqlite3.Connection, tournament: Tournament) -> Recalculation:
+    """Recalculates the sessions of the tournament whose fingerprint has changed (see
+    gametournament.fingerprint), returning the scores whose metascore would change.
+
+    When no fingerprint has changed, nothing is recalculated at all.
+    """
+    batch = db.get_score_batch(connection, tournament['id'])
+    sessions = db.get_sessions(connection, tournament['id'])
+    fingerprints = fingerprint.batch_fingerprints(tournament, batch, sessions)
+    stale = {
+        session['id']: fingerprints[session['id']]
+        for session in sessions
+        if session['id'] in fingerprints and session['fingerprint'] != fingerprints[session['id']]
+    }
+    if not stale:
+        return Recalculation([], {})
+
+    batch = batch.select_sessions(stale.keys())
+    new_scores = BatchScorer(tournament).compute_metascores(batch, sessions)
+    changed = np.flatnonzero(new_scores != np.frombuffer(batch.tournament_scores, dtype=np.float64))
+    if len(changed) == 0:
+        return Recalculation([], stale)
+
+    games = {session['id']: session['game'] for session in sessions}
+    names = {player['id']: player['name'] for player in db.get_players(connection, tournament['id'])}
+    return Recalculation([
+        ScoreChange(
+            batch.score_ids[i],
+            batch.session_ids[i],
+            games[batch.session_ids[i]],
+            names[batch.player_ids[i]],
+            batch.tournament_scores[i],
+            new_scores[i].item(),
+        )
+        for i in changed.tolist()
+    ], stale)
+
+
+def find_changes_in_worker(path: Path, tournament_id: int) -> tuple[Tournament, Recalculation]:
+    """Runs find_changes in a worker process, on its own read connection."""
+    with db.get_connection(path) as connection:
+        tournament = db.get_tournament(connection, tournament_id)
+        return tournament, find_changes(connection, tournament)
+
+
+def find_changes_in_parallel(
+    tournament_ids: list[int],
+    path: Path = None,
+    workers: int = None,
+) -> Iterator[tuple[Tournament, Recalculation]]:
+    """Shards the tournaments across a process pool, yielding each one's changes as it finishes."""
+    path = path or db.DB_FILE
+    if workers == 1 or len(tournament_ids) == 1:
+        for tournament_id in tournament_ids:
+            yield find_changes_in_worker(path, tournament_id)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(find_changes_in_worker, path, tournament_id) for tournament_id in tournament_ids]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def apply_changes(connection: sqlite3.Connection, recalculation: Recalculation) -> int:
+    """Records the changed scores and the new fingerprints, returning how many scores changed."""
+    db.set_fingerprints(connection, recalculation.fingerprints)
+    return db.update_scores(
+        connection,
+        [TourneyScore(score_id=change.score_id, tournament_score=change.new_score) for change in recalculation.changes],
+    )
@@ -0,0 +1,71 @@
+import itertools
+from array import array
+from typing import Iterable, Iterator
+
+from gametournament.models import TourneyScore
+
+
+class ScoreBatch:
+    """Many scores held as parallel, compactly-typed columns instead of one TourneyScore dict per score.
+
+    Each column is an array.array (8 bytes per value), so a 100k score tournament takes a few MB, and the
+    columns can be viewed as numpy arrays without copying (np.frombuffer). Scores are kept in the order
+    they were added; batches loaded from the db are ordered by session.
+    """
+    __slots__ = ("score_ids", "session_ids", "player_ids", "game_scores", "tournament_scores")
+
+    def __init__(self):
+        self.score_ids = array("q")
+        self.session_ids = array("q")
+        self.player_ids = array("q")
+        self.game_scores = array("d")
+        self.tournament_scores = array("d")
+
+    def __len__(self) -> int:
+        return len(self.score_ids)
+
+    def append(self, score_id: int, session_id: int, player_id: int, game_score: float, tournament_score: float):
+        self.score_ids.append(score_id)
+        self.session_ids.append(session_id)
+        self.player_ids.append(player_id)
+        self.game_scores.append(game_score)
+        self.tournament_scores.append(tournament_score)
+
+    def extend(self, rows: Iterable[tuple[int, int, int, float, float]]):
+        """Adds (score_id, session_id, player_id, game_score, tournament_score) rows."""
+        # Transposing the rows lets each column be extended in one call, rather than appending value by value
+        for column, values in zip(self.__slots__, zip(*rows)):
+            getattr(self, column).extend(values)
+
+    def with_tournament_scores(self, tournament_scores: Iterable[float]) -> "ScoreBatch":
+        """Gets a copy of this batch with different metascores."""
+        batch = ScoreBatch()
+        batch.score_ids = array("q", self.score_ids)
+        batch.session_ids = array("q", self.session_ids)
+        batch.player_ids = array("q", self.player_ids)
+        batch.game_scores = array("d", self.game_scores)
+        batch.tournament_scores = array("d", tournament_scores)
+        if len(batch.tournament_scores) != len(batch):
+            raise ValueError(f"Expected {len(batch)} metascores, got {len(batch.tournament_scores)}")
+        return batch
+
+    def select_sessions(self, session_ids: set[int]) -> "ScoreBatch":
+        """Gets a copy of this batch with only the scores from the given sessions."""
+        selected = [session_id in session_ids for session_id in self.session_ids]
+        batch = ScoreBatch()
+        for name in self.__slots__:
+            setattr(batch, name, array(getattr(self, name).typecode, itertools.compress(getattr(self, name), selected)))
+        return batch
+
+    def __iter__(self) -> Iterator[TourneyScore]:
+        """Iterates the scores as TourneyScores. These are built on the fly, so avoid this for big batches."""
+        for score_id, player_id, game_score, tournament_score in zip(
+            self.score_ids, self.player_ids, self.game_scores, self.tournament_scores
+        ):
+            yield TourneyScore(
+                score_id=score_id,
+                player_id=player_id,
+                game_score=game_score,
+                tournament_score=tournament_score,
+            )
+
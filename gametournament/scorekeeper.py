@@ -0,0 +1,186 @@
+"""Keeps everything needed to record games warm between entries, for the interactive session command.
+
+A Scorekeeper holds one connection, the tournament, its players, the games played so far (which double
+as shortcuts) and a scorer for each kind of game, so recording a game is only the scoring. The scored
+games wait in memory, where the latest ones can be undone, until they're flushed: all written in one
+short transaction. No transaction stays open between entries, so other writers (such as the server)
+are never kept waiting on a session.
+"""
+import math
+import sqlite3
+from datetime import datetime
+from typing import NamedTuple, Literal
+
+from gametournament import db
+from gametournament.base_scorer import BaseScorer
+from gametournament.cache import LRUCache
+from gametournament.models import Player, Tournament, TourneyScore
+from gametournament.point_scorer import PointScorer
+from gametournament.rank_scorer import RankScorer, are_valid_ranks
+
+
+class EntryError(ValueError):
+    """Raised when an entry can't be recorded"""
+
+
+class Game(NamedTuple):
+    name: str
+    hours: float
+    score_type: Literal['points', 'rank']
+
+
+class RecordedGame(NamedTuple):
+    game: Game
+    scores: dict[int, TourneyScore]
+    recorded_at: datetime
+
+
+class Scorekeeper:
+    def __init__(self, connection: sqlite3.Connection, tournament: Tournament):
+        self.connection = connection
+        self.tournament = tournament
+        self.players = db.get_players(connection, tournament['id'])
+        self._players_by_name = {player['name'].lower(): player for player in self.players}
+        # Keyed by lowercase name; most played first, which is also the order of the numbered shortcuts
+        self.games: dict[str, Game] = {
+            row['game'].lower(): Game(row['game'], row['hours'], row['score_type'])
+            for row in db.get_games(connection, tournament['id'])
+        }
+        # The games recorded since the last flush, oldest first. None of them are in the db yet.
+        self.pending: list[RecordedGame] = []
+        # Scorers only depend on the score type and hours, so they're reused across games and players
+        self._scorers: LRUCache[BaseScorer] = LRUCache(max_size=32)
+
+    def find_game(self, text: str) -> Game | None:
+        """Finds a known game by its shortcut number, its name, or an unambiguous start of its name (ignoring case)."""
+        games = list(self.games.values())
+        if text.isdigit():
+            index = int(text) - 1
+            return games[index] if 0 <= index < len(games) else None
+        if text.lower() in self.games:
+            return self.games[text.lower()]
+        matches = [game for name, game in self.games.items() if name.startswith(text.lower())]
+        return matches[0] if len(matches) == 1 else None
+
+    def find_player(self, text: str) -> Player:
+        """Finds a player by name or an unambiguous start of their name (ignoring case)."""
+        if text.lower() in self._players_by_name:
+            return self._players_by_name[text.lower()]
+        matches = [player for name, player in self._players_by_name.items() if name.startswith(text.lower())]
+        if len(matches) != 1:
+            problem = "matches nobody" if not matches else f"could be {', '.join(player['name'] for player in matches)}"
+            raise EntryError(f"'{text}' {problem}")
+        return matches[0]
+
+    def parse_entry(self, words: list[str]) -> tuple[Game, list[tuple[Player, float]]]:
+        """Parses GAME [HOURS] [points|rank] PLAYER=SCORE... into the game and its results.
+
+        A known game (see find_game) defaults to the hours and score type it was last played with; a new
+        one needs both.
+        """
+        if not words:
+            raise EntryError("Enter a game followed by PLAYER=SCORE for everyone who played")
+        name, *rest = words
+        hours = score_type = None
+        while rest and "=" not in rest[0]:
+            word = rest.pop(0)
+            if word.lower() in ('points', 'rank'):
+                score_type = word.lower()
+                continue
+            try:
+                hours = float(word)
+            except ValueError:
+                raise EntryError(f"'{word}' isn't a number of hours, 'points', 'rank' or PLAYER=SCORE") from None
+
+        known = self.find_game(name)
+        if known is None and (hours is None or score_type is None):
+            raise EntryError(f"'{name}' hasn't been played yet; give its hours and 'points' or 'rank'")
+        game = Game(
+            known.name if known else name,
+            hours if hours is not None else known.hours,
+            score_type or known.score_type,
+        )
+        if not math.isfinite(game.hours) or game.hours <= 0:
+            raise EntryError("The hours must be a finite number more than 0")
+
+        results = []
+        for word in rest:
+            player_name, equals, score = word.partition("=")
+            if not equals:
+                raise EntryError(f"'{word}' should be PLAYER=SCORE")
+            player = self.find_player(player_name)
+            try:
+                score = float(score)
+            except ValueError:
+                raise EntryError(f"'{score}' isn't a number, in {word}") from None
+            if not math.isfinite(score):
+                raise EntryError(f"'{score}' isn't a finite number, in {word}")
+            results.append((player, score))
+        if not results:
+            raise EntryError("Give PLAYER=SCORE for everyone who played")
+        if len({player['id'] for player, _ in results}) != len(results):
+            raise EntryError("Each player can only have one result")
+        if game.score_type == 'rank' and not are_valid_ranks([score for _, score in results]):
+            raise EntryError(f"Ranks must be whole numbers from 1 to {len(results)}")
+        return game, results
+
+    def record(self, game: Game, results: list[tuple[Player, float]]) -> RecordedGame:
+        """Scores a game and adds it to the pending games, without writing it to the db yet."""
+        scorer = self._scorers.get_or_compute(
+            (game.score_type, game.hours),
+            lambda: (PointScorer if game.score_type == 'points' else RankScorer)(self.tournament, self.players, game.hours),
+        )
+        scores = scorer.score_raw([(player['id'], int(score) if game.score_type == 'rank' else score) for player, score in results])
+
+        recorded = RecordedGame(game, scores, datetime.now())
+        self.pending.append(recorded)
+        # Assigning keeps a known game's place in the shortcuts, but updates its hours and score type
+        self.games[game.name.lower()] = game
+        return recorded
+
+    def undo(self) -> RecordedGame | None:
+        """Takes back the latest game that hasn't been flushed yet, returning it (or None if there isn't one)."""
+        if not self.pending:
+            return None
+        recorded = self.pending.pop()
+        # A new game that was only played in the undone entry is no longer a shortcut
+        played = {row['game'] for row in db.get_games(self.connection, self.tournament['id'])}
+        played.update(pending.game.name for pending in self.pending)
+        if recorded.game.name not in played:
+            self.games.pop(recorded.game.name.lower(), None)
+        return recorded
+
+    def flush(self) -> int:
+        """Writes the pending games in one transaction, returning how many there were.
+
+        If the write fails, nothing is written and the games stay pending, so flushing can be tried again.
+        """
+        with self.connection:
+            for recorded in self.pending:
+                db.record_scores(
+                    self.connection,
+                    self.tournament['id'],
+                    recorded.game.name,
+                    recorded.game.hours,
+                    recorded.scores.values(),
+                    recorded.recorded_at,
+                )
+        flushed = len(self.pending)
+        self.pending.clear()
+        return flushed
+
+    def standings(self) -> list[tuple[Player, float, int, float]]:
+        """The standings, including the games that haven't been flushed yet."""
+        totals = {
+            player['id']: [player, total, game_count]
+            for player, total, game_count, _ in db.get_scores(self.connection, self.tournament['id'])
+        }
+        for recorded in self.pending:
+            for score in recorded.scores.values():
+                totals[score['player_id']][1] += score['tournament_score']
+                totals[score['player_id']][2] += 1
+        standings = [
+            (player, total, game_count, total / game_count if game_count else 0)
+            for player, total, game_count in totals.values()
+        ]
+        return sorted(standings, key=lambda standing: standing[3], reverse=True)
@@ -0,0 +1,264 @@
+"""A small asyncio HTTP/JSON server for venue display boards and score-entry tablets.
+
+It only uses the standard library, so it runs fully offline. Everything that touches SQLite is run on a
+bounded thread pool (with one pooled connection per worker), so slow queries never block the event loop
+and dozens of polling clients can be served at once.
+
+Routes:
+    GET  /tournaments
+    GET  /tournaments/{id}/standings
+    GET  /tournaments/{id}/log?game=&player=&limit=&after=
+    GET  /tournaments/{id}/formulae
+    GET  /cache                      Hit/miss counters of the standings cache
+    POST /tournaments/{id}/scores   {"game": ..., "hours": ..., "type": "points"|"rank",
+                                     "results": [{"player_id": ... or "player": ..., "score": ...}, ...]}
+"""
+import asyncio
+import functools
+import json
+import logging
+import math
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import Callable
+from urllib.parse import urlsplit, parse_qs
+
+from gametournament import db
+from gametournament.cache import StandingsCache
+from gametournament.models import Tournament
+from gametournament.point_scorer import PointScorer, PointFormula
+from gametournament.rank_scorer import RankScorer, RankFormula, are_valid_ranks
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADERS = 100
+KEEP_ALIVE_SECONDS = 30
+DEFAULT_LOG_LIMIT = 100
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str = None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+# A handler gets a connection, the tournament, the query string parameters and the parsed JSON body
+type Handler = Callable[[sqlite3.Connection, Tournament, dict[str, str], object], object]
+
+
+class TournamentServer:
+    def __init__(self, path: Path = None, workers: int = 8):
+        self.pool = db.ConnectionPool(path, size=workers)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tournament-db")
+        self.standings_cache = StandingsCache()
+        self.routes: list[tuple[str, re.Pattern, Handler]] = [
+            ("GET", re.compile(r"/tournaments/(\d+)/standings"), functools.partial(get_standings, cache=self.standings_cache)),
+            ("GET", re.compile(r"/tournaments/(\d+)/log"), get_log),
+            ("GET", re.compile(r"/tournaments/(\d+)/formulae"), get_formulae),
+            ("POST", re.compile(r"/tournaments/(\d+)/scores"), post_scores),
+        ]
+
+    async def serve_forever(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=True)
+            self.pool.close()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_SECONDS)
+                if not request_line.strip():
+                    break
+                keep_alive = await self.handle_request(request_line, reader, writer)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, request_line: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Reads the rest of the request, and writes the response. Returns whether to keep the connection open."""
+        keep_alive = False
+        try:
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+            headers = {}
+            while (line := await reader.readline()).strip():
+                if len(headers) >= MAX_HEADERS:
+                    raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                keep_alive = False
+                raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            body = await reader.readexactly(length) if length else b""
+
+            status, payload = HTTPStatus.OK, await self.dispatch(method, target, body)
+        except HTTPError as e:
+            status, payload = e.status, {"error": str(e)}
+        except ValueError as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception:
+            logger.exception("Error handling %s", request_line)
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": HTTPStatus.INTERNAL_SERVER_ERROR.phrase}
+
+        content = json.dumps(payload, default=str).encode()
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(content)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"\r\n".encode("latin-1") + content
+        )
+        await writer.drain()
+        return keep_alive
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> object:
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path.rstrip("/") == "/tournaments":
+            if method != "GET":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+            return await self.run_db(db.get_tournaments)
+        if url.path.rstrip("/") == "/cache":
+            return self.standings_cache.stats()
+
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(url.path.rstrip("/"))
+            if match is None:
+                continue
+            if method != route_method:
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+            try:
+                parsed_body = json.loads(body) if body else None
+            except json.JSONDecodeError as e:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON body: {e}")
+            return await self.run_db(call_for_tournament, handler, int(match.group(1)), query, parsed_body)
+
+        raise HTTPError(HTTPStatus.NOT_FOUND)
+
+    async def run_db[R](self, func: Callable[..., R], *args) -> R:
+        """Runs func(connection, *args) on the thread pool, with a pooled connection."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(self._with_connection, func, *args))
+
+    def _with_connection[R](self, func: Callable[..., R], *args) -> R:
+        with self.pool.connection() as connection:
+            return func(connection, *args)
+
+
+def call_for_tournament(connection: sqlite3.Connection, handler: Handler, tournament_id: int, query: dict, body) -> object:
+    tournament = db.get_tournament(connection, tournament_id)
+    if tournament is None:
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"There is no tournament with id {tournament_id}")
+    return handler(connection, tournament, query, body)
+
+
+def get_standings(
+    connection: sqlite3.Connection,
+    tournament: Tournament,
+    query: dict,
+    body,
+    cache: StandingsCache = None,
+) -> list[dict]:
+    if cache is None:
+        current_totals = db.get_scores(connection, tournament['id'])
+    else:
+        current_totals = cache.get_scores(connection, tournament['id'])
+    return [
+        dict(player_id=player['id'], name=player['name'], total=total, game_count=game_count, average=average)
+        for player, total, game_count, average in current_totals
+    ]
+
+
+def get_log(connection: sqlite3.Connection, tournament: Tournament, query: dict, body) -> list[dict]:
+    records = db.iter_records(
+        connection,
+        tournament['id'],
+        game=query.get("game"),
+        player=query.get("player"),
+        after_id=int(query["after"]) if "after" in query else None,
+        limit=int(query.get("limit", DEFAULT_LOG_LIMIT)),
+    )
+    return [dict(record) for record in records]
+
+
+def get_formulae(connection: sqlite3.Connection, tournament: Tournament, query: dict, body) -> dict:
+    return {
+        "points": PointFormula(tournament, 1).show(),
+        "rank": RankFormula(tournament, 1).show(),
+    }
+
+
+def post_scores(connection: sqlite3.Connection, tournament: Tournament, query: dict, body) -> dict:
+    """Scores and records one game, returning its metascores and the new standings."""
+    if not isinstance(body, dict) or not isinstance(body.get("results"), list) or not body["results"]:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "The body must be an object with a non-empty list of results")
+    if body.get("type") not in ("points", "rank"):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "type must be 'points' or 'rank'")
+    game = str(body.get("game", "")).strip()
+    if game == "":
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "game is required")
+    try:
+        hours = float(body["hours"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "hours must be a number")
+    if not math.isfinite(hours) or hours <= 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "hours must be a finite number more than 0")
+
+    players = db.get_players(connection, tournament['id'])
+    players_by_id = {player['id']: player for player in players}
+    players_by_name = {player['name']: player for player in players}
+    game_players = []
+    raw_scores = []
+    for result in body["results"]:
+        if not isinstance(result, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Each result must be an object")
+        player = players_by_id.get(result.get("player_id")) or players_by_name.get(result.get("player"))
+        if player is None:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unknown player in result {result}")
+        try:
+            score = float(result["score"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Result {result} needs a numeric score")
+        if not math.isfinite(score):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Result {result} needs a finite score")
+        if any(player_id == player['id'] for player_id, _ in raw_scores):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"{player['name']} has more than one result")
+        game_players.append(player)
+        raw_scores.append((player['id'], score))
+
+    if body["type"] == "points":
+        scorer = PointScorer(tournament, game_players, hours)
+    else:
+        if not are_valid_ranks([score for _, score in raw_scores]):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Ranks must be whole numbers from 1 to {len(raw_scores)}")
+        scorer = RankScorer(tournament, game_players, hours)
+        raw_scores = [(player_id, int(rank)) for player_id, rank in raw_scores]
+    scores = scorer.score_raw(raw_scores)
+    session_id = db.record_scores(connection, tournament['id'], game, hours, scores.values())
+
+    return {
+        "session_id": session_id,
+        "scores": [
+            dict(score, name=players_by_id[score['player_id']]['name'])
+            for score in scores.values()
+        ],
+        # Read straight from the db, since the cache must only ever see committed data
+        "standings": get_standings(connection, tournament, query, body),
+    }
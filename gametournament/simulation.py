@@ -0,0 +1,142 @@
+"""Monte Carlo projection of a tournament's final standings.
+
+Each simulation plays out the remaining games with every player taking part. A game's type and length
+are drawn from the games played so far, and each player's result is drawn from a normal distribution
+fitted to their metascores per hour so far. Players are ranked by their draws, which also stand in as
+the points of point games, and the games are scored with the tournament's own Point/Rank formulae,
+evaluated over whole arrays of simulations at once.
+"""
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from gametournament import db
+from gametournament.models import Tournament
+from gametournament.point_scorer import PointFormula
+from gametournament.rank_scorer import RankFormula
+
+# Simulations run this many at a time, which keeps the (simulations, games, players) arrays small
+CHUNK_SIZE = 1000
+
+
+class SimulationModel(NamedTuple):
+    tournament: Tournament
+    player_ids: np.ndarray
+    totals: np.ndarray
+    game_counts: np.ndarray
+    strengths: np.ndarray
+    spreads: np.ndarray
+    session_hours: np.ndarray
+    session_is_points: np.ndarray
+
+
+class Projection(NamedTuple):
+    player_ids: np.ndarray
+    # probabilities[i, j] is the chance that player_ids[i] finishes in position j (0 being first)
+    probabilities: np.ndarray
+    seed: int
+
+
+def build_model(connection: sqlite3.Connection, tournament: Tournament) -> SimulationModel:
+    """Fits the simulation model to the tournament's recorded games.
+
+    Players with fewer than two scores are given the mean/spread of everyone's scores.
+    """
+    sessions = db.get_sessions(connection, tournament['id'])
+    if not sessions:
+        raise ValueError(f"{tournament['name']} has no recorded games to base a simulation on")
+    session_ids = np.array([session['id'] for session in sessions], dtype=np.int64)
+    session_hours = np.array([session['hours'] for session in sessions], dtype=np.float64)
+    session_is_points = np.array([session['score_type'] == 'points' for session in sessions], dtype=bool)
+
+    standings = {player['id']: (total, game_count) for player, total, game_count, _ in db.get_scores(connection, tournament['id'])}
+    player_ids = np.array(sorted(standings), dtype=np.int64)
+    totals = np.array([standings[player_id][0] for player_id in player_ids], dtype=np.float64)
+    game_counts = np.array([standings[player_id][1] for player_id in player_ids], dtype=np.int64)
+
+    batch = db.get_score_batch(connection, tournament['id'])
+    hours = session_hours[np.searchsorted(session_ids, np.frombuffer(batch.session_ids, dtype=np.int64))]
+    per_hour = np.frombuffer(batch.tournament_scores, dtype=np.float64) / hours
+    player_index = np.searchsorted(player_ids, np.frombuffer(batch.player_ids, dtype=np.int64))
+
+    pooled_mean = per_hour.mean()
+    pooled_spread = per_hour.std(ddof=1) if len(per_hour) > 1 else 0.0
+    counts = np.bincount(player_index, minlength=len(player_ids))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.bincount(player_index, weights=per_hour, minlength=len(player_ids)) / counts
+        squares = np.bincount(player_index, weights=(per_hour - means[player_index]) ** 2, minlength=len(player_ids))
+        spreads = np.sqrt(squares / (counts - 1))
+    has_history = counts >= 2
+
+    return SimulationModel(
+        tournament=tournament,
+        player_ids=player_ids,
+        totals=totals,
+        game_counts=game_counts,
+        strengths=np.where(has_history, means, pooled_mean),
+        spreads=np.where(has_history, spreads, pooled_spread),
+        session_hours=session_hours,
+        session_is_points=session_is_points,
+    )
+
+
+def simulate_positions(model: SimulationModel, simulations: int, games: int, seed: np.random.SeedSequence) -> np.ndarray:
+    """Runs the simulations, returning how many times each player finished in each position."""
+    rng = np.random.default_rng(seed)
+    players = len(model.player_ids)
+    position_counts = np.zeros(players * players, dtype=np.int64)
+    player_offsets = np.arange(players) * players
+
+    for start in range(0, simulations, CHUNK_SIZE):
+        chunk = min(CHUNK_SIZE, simulations - start)
+        template = rng.integers(len(model.session_hours), size=(chunk, games))
+        hours = model.session_hours[template][..., np.newaxis]
+        is_points = model.session_is_points[template][..., np.newaxis]
+
+        draws = rng.normal(model.strengths, model.spreads, size=(chunk, games, players))
+        # The best draw gets an inverse rank of players, the worst 1. Draws are continuous, so there are no ties.
+        inverse_ranks = draws.argsort(axis=-1).argsort(axis=-1) + 1.0
+        if players > 1:
+            std = draws.std(axis=-1, ddof=1, keepdims=True)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                std_devs = np.where(std > 0, (draws - draws.mean(axis=-1, keepdims=True)) / std, 0.0)
+        else:
+            std_devs = np.zeros_like(draws)
+
+        metascores = np.where(
+            is_points,
+            PointFormula(model.tournament, hours).compile()(inverse_ranks, std_devs),
+            RankFormula(model.tournament, hours).compile()(inverse_ranks),
+        )
+        averages = (model.totals + metascores.sum(axis=1)) / (model.game_counts + games)
+        positions = (-averages).argsort(axis=-1).argsort(axis=-1)
+        position_counts += np.bincount((positions + player_offsets).ravel(), minlength=players * players)
+
+    return position_counts.reshape(players, players)
+
+
+def project(model: SimulationModel, simulations: int, games: int, seed: int = None, workers: int = 1) -> Projection:
+    """Simulates the remaining games, splitting the simulations across worker processes.
+
+    Each worker gets its own stream spawned from the seed, so a seed (with the same number of workers)
+    always gives the same result. Without a seed, a random one is used and returned.
+    """
+    seed_sequence = np.random.SeedSequence(seed)
+    seeds = seed_sequence.spawn(workers)
+    shares = [simulations // workers + (i < simulations % workers) for i in range(workers)]
+
+    if workers == 1:
+        position_counts = simulate_positions(model, simulations, games, seeds[0])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            position_counts = sum(executor.map(
+                simulate_positions,
+                [model] * workers,
+                shares,
+                [games] * workers,
+                seeds,
+            ))
+
+    return Projection(model.player_ids, position_counts / simulations, seed_sequence.entropy)
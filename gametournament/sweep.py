@@ -0,0 +1,94 @@
+"""Compares a tournament's standings under many different formula settings.
+
+The formula variables of every score (inverse ranks, +/- standard deviations from the mean, hours) don't
+depend on the settings, so they're worked out once. The settings are then passed to the compiled
+formulae as columns, which gives the metascores for a whole block of settings as one matrix.
+"""
+import itertools
+import sqlite3
+from typing import NamedTuple
+
+import numpy as np
+
+from gametournament import db
+from gametournament.batch_scorer import BatchScorer
+from gametournament.models import Tournament
+
+# Settings are evaluated in blocks of at most this many metascores, to bound the size of the matrix
+MAX_BLOCK_SIZE = 4_000_000
+
+
+class Setting(NamedTuple):
+    rank_multiplier: float
+    duration_multiplier: float
+    apply_bonus_or_penalty: bool
+
+
+class SweepResult(NamedTuple):
+    player_ids: np.ndarray
+    settings: list[Setting]
+    # positions[i, j] is where player_ids[j] finishes under settings[i] (0 being first)
+    positions: np.ndarray
+    # Where each player finishes under the tournament's own settings
+    current_positions: np.ndarray
+
+    def rank_correlations(self) -> np.ndarray:
+        """The Spearman correlation of each setting's finishing order with the current one."""
+        players = len(self.player_ids)
+        if players < 2:
+            return np.ones(len(self.settings))
+        squared_differences = ((self.positions - self.current_positions) ** 2).sum(axis=1)
+        return 1 - 6 * squared_differences / (players * (players ** 2 - 1))
+
+
+def sweep(
+    connection: sqlite3.Connection,
+    tournament: Tournament,
+    rank_multipliers: list[float],
+    duration_multipliers: list[float],
+    bonus_options: list[bool],
+) -> SweepResult:
+    """Works out every player's finishing position under every combination of the given settings."""
+    batch = db.get_score_batch(connection, tournament['id'])
+    inputs = BatchScorer(tournament).formula_inputs(batch, db.get_sessions(connection, tournament['id']))
+
+    player_ids = np.array(sorted(player['id'] for player in db.get_players(connection, tournament['id'])), dtype=np.int64)
+    player_index = np.searchsorted(player_ids, np.frombuffer(batch.player_ids, dtype=np.int64))
+    # Sorting the scores by player lets each player's total be summed with one reduceat over the columns
+    order = np.argsort(player_index, kind='stable')
+    counts = np.bincount(player_index, minlength=len(player_ids))
+    played = counts > 0
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[played]
+    inputs = inputs._replace(**{field: getattr(inputs, field)[order] for field in inputs._fields})
+
+    def positions_for(settings: list[Setting], apply_bonus_or_penalty: bool) -> np.ndarray:
+        scorer = BatchScorer(Tournament(
+            tournament,
+            rank_multiplier=np.array([setting.rank_multiplier for setting in settings])[:, np.newaxis],
+            duration_multiplier=np.array([setting.duration_multiplier for setting in settings])[:, np.newaxis],
+            apply_bonus_or_penalty=apply_bonus_or_penalty,
+        ))
+        metascores = scorer.evaluate(inputs)
+        averages = np.zeros((len(settings), len(player_ids)))
+        if played.any():
+            averages[:, played] = np.add.reduceat(metascores, starts, axis=1) / counts[played]
+        # Players who tie keep the order of their ids
+        return np.argsort(-averages, axis=1, kind='stable').argsort(axis=1)
+
+    current = Setting(tournament['rank_multiplier'], tournament['duration_multiplier'], bool(tournament['apply_bonus_or_penalty']))
+    current_positions = positions_for([current], current.apply_bonus_or_penalty)[0]
+
+    settings = []
+    blocks = []
+    block_size = max(1, MAX_BLOCK_SIZE // max(1, len(batch)))
+    for apply_bonus_or_penalty in bonus_options:
+        grid = [
+            Setting(rank_multiplier, duration_multiplier, apply_bonus_or_penalty)
+            for rank_multiplier, duration_multiplier in itertools.product(rank_multipliers, duration_multipliers)
+        ]
+        for start in range(0, len(grid), block_size):
+            block = grid[start:start + block_size]
+            blocks.append(positions_for(block, apply_bonus_or_penalty))
+            settings.extend(block)
+
+    return SweepResult(player_ids, settings, np.concatenate(blocks), current_positions)
@@ -0,0 +1,41 @@
+"""Shared setup for the tests: a tournament in a fresh db file of its own."""
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from gametournament import db
+from gametournament.models import Tournament
+
+
+class TournamentTestCase(unittest.TestCase):
+    """Gives each test a new db with one tournament, whose players are Ann, Bob and Cy."""
+    players = ["Ann", "Bob", "Cy"]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db_path = Path(directory.name) / "tournament.db"
+        self.connection = self.connect()
+        db.create_tables(self.connection)
+        self.tournament = db.create_tournament(self.connection, Tournament(
+            name="Cup",
+            start_date=datetime(2024, 1, 1),
+            rank_multiplier=2.0,
+            duration_multiplier=1.5,
+            apply_bonus_or_penalty=True,
+        ))
+        db.insert_players(self.connection, self.tournament['id'], self.players)
+        self.connection.commit()
+
+    def connect(self) -> sqlite3.Connection:
+        connection = db.get_connection(self.db_path)
+        self.addCleanup(connection.close)
+        return connection
+
+    def player_ids(self) -> dict[str, int]:
+        return {player['name']: player['id'] for player in db.get_players(self.connection, self.tournament['id'])}
+
+    def score_count(self) -> int:
+        return self.connection.execute("SELECT count(*) FROM scores").fetchone()[0]
@@ -0,0 +1,55 @@
+import io
+
+from gametournament import db, importer
+from gametournament.importer import ResultsFileError
+from tests.support import TournamentTestCase
+
+
+def csv_file(*rows: str) -> io.StringIO:
+    return io.StringIO("\n".join(["game,hours,type,player,score", *rows]) + "\n")
+
+
+class ImportGamesTest(TournamentTestCase):
+    def import_csv(self, *rows: str) -> tuple[int, int]:
+        games = importer.group_games(importer.read_rows(csv_file(*rows), 'csv'))
+        return importer.import_games(self.connection, self.tournament, games)
+
+    def assert_rejected(self, *rows: str, message: str):
+        with self.assertRaisesRegex(ResultsFileError, message):
+            self.import_csv(*rows)
+        self.connection.rollback()
+        self.assertEqual(self.score_count(), 0)
+
+    def test_imports_games(self):
+        self.assertEqual(self.import_csv("Catan,2,points,Ann,10", "Catan,2,points,Bob,7", "Azul,1,rank,Cy,1"), (2, 3))
+        self.assertEqual(self.score_count(), 3)
+
+    def test_keeps_tied_fractional_points(self):
+        self.import_csv("Catan,2,points,Ann,7.5", "Catan,2,points,Bob,7.5", "Catan,2,points,Cy,3")
+        points = [row[0] for row in self.connection.execute("SELECT points_or_rank FROM scores ORDER BY player_id")]
+        self.assertEqual(points, [7.5, 7.5, 3])
+
+    def test_rejects_negative_hours(self):
+        self.assert_rejected("Catan,-2,points,Ann,10", "Catan,-2,points,Bob,7", message="Row 1 has hours of -2")
+
+    def test_rejects_zero_hours(self):
+        self.assert_rejected("Catan,0,points,Ann,10", message="Row 1 has hours of 0")
+
+    def test_rejects_infinite_hours(self):
+        self.assert_rejected("Catan,inf,points,Ann,10", message="Row 1 .* must be finite")
+
+    def test_rejects_nan_score(self):
+        self.assert_rejected("Catan,2,points,Ann,10", "Catan,2,points,Bob,nan", message="Row 2 .* must be finite")
+
+    def test_rejects_infinite_score(self):
+        self.assert_rejected("Catan,2,points,Ann,-inf", message="Row 1 .* must be finite")
+
+    def test_rejects_rank_beyond_the_player_count(self):
+        self.assert_rejected("Azul,1,rank,Ann,9", "Azul,1,rank,Bob,1", message="must be whole numbers from 1 to 2")
+
+    def test_rejects_fractional_rank(self):
+        self.assert_rejected("Azul,1,rank,Ann,1.5", "Azul,1,rank,Bob,1", message="must be whole numbers from 1 to 2")
+
+    def test_standings_stay_finite(self):
+        self.assert_rejected("Catan,inf,points,Ann,10", message="must be finite")
+        self.assertTrue(all(total == 0 for _, total, _, _ in db.get_scores(self.connection, self.tournament['id'])))
@@ -0,0 +1,93 @@
+import sqlite3
+
+from gametournament import db
+from gametournament.point_scorer import PointScorer
+from gametournament.scorekeeper import EntryError, Scorekeeper
+from tests.support import TournamentTestCase
+
+
+class ScorekeeperTest(TournamentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.scorekeeper = Scorekeeper(self.connection, self.tournament)
+
+    def enter(self, line: str):
+        return self.scorekeeper.record(*self.scorekeeper.parse_entry(line.split()))
+
+    def test_records_nothing_until_flushed(self):
+        self.enter("Catan 2 points ann=10 bob=7 cy=3")
+        self.enter("catan ann=4 bob=9 cy=9")
+        self.assertEqual(self.score_count(), 0)
+        self.assertEqual(self.scorekeeper.flush(), 2)
+        self.assertEqual(self.score_count(), 6)
+        self.assertEqual(self.scorekeeper.pending, [])
+
+    def test_undo_takes_back_the_latest_game(self):
+        self.enter("Catan 2 points ann=10 bob=7 cy=3")
+        self.enter("Azul 1 rank ann=1 bob=2 cy=3")
+        self.assertEqual(self.scorekeeper.undo().game.name, "Azul")
+        self.assertIsNone(self.scorekeeper.find_game("azul"))
+        self.scorekeeper.flush()
+        games = [row['game'] for row in self.connection.execute("SELECT game FROM game_sessions")]
+        self.assertEqual(games, ["Catan"])
+        self.assertIsNone(self.scorekeeper.undo())
+
+    def test_standings_include_pending_games(self):
+        self.enter("Catan 2 points ann=10 bob=7 cy=3")
+        pending_standings = self.scorekeeper.standings()
+        self.scorekeeper.flush()
+        self.assertEqual(
+            [(player['name'], game_count) for player, _, game_count, _ in pending_standings],
+            [(player['name'], game_count) for player, _, game_count, _ in db.get_scores(self.connection, self.tournament['id'])],
+        )
+        for (_, pending_total, _, _), (_, total, _, _) in zip(pending_standings, db.get_scores(self.connection, self.tournament['id'])):
+            self.assertAlmostEqual(pending_total, total)
+
+    def test_another_writer_can_write_during_a_session(self):
+        self.enter("Catan 2 points ann=10 bob=7 cy=3")
+        other = self.connect()
+        other.execute("PRAGMA busy_timeout = 100")
+        players = db.get_players(other, self.tournament['id'])
+        scores = PointScorer(self.tournament, players, 1).score_raw([(player['id'], 5) for player in players])
+        db.record_scores(other, self.tournament['id'], "Go", 1, scores.values())
+        other.commit()
+
+        self.assertEqual(self.scorekeeper.flush(), 1)
+        games = sorted(row['game'] for row in self.connection.execute("SELECT game FROM game_sessions"))
+        self.assertEqual(games, ["Catan", "Go"])
+
+    def test_a_failed_flush_keeps_the_games_pending(self):
+        self.enter("Catan 2 points ann=10 bob=7 cy=3")
+        other = self.connect()
+        other.execute("BEGIN IMMEDIATE")
+        self.connection.execute("PRAGMA busy_timeout = 100")
+        with self.assertRaises(sqlite3.OperationalError):
+            self.scorekeeper.flush()
+        other.rollback()
+
+        self.assertEqual(len(self.scorekeeper.pending), 1)
+        self.assertEqual(self.scorekeeper.flush(), 1)
+        self.assertEqual(self.score_count(), 3)
+
+    def assert_rejected(self, line: str, message: str):
+        with self.assertRaisesRegex(EntryError, message):
+            self.scorekeeper.parse_entry(line.split())
+
+    def test_rejects_a_player_given_twice(self):
+        self.assert_rejected("Catan 2 points ann=10 ann=7", "only have one result")
+
+    def test_rejects_bad_ranks(self):
+        self.assert_rejected("Azul 1 rank ann=9 bob=1", "whole numbers from 1 to 2")
+        self.assert_rejected("Azul 1 rank ann=1.5 bob=1", "whole numbers from 1 to 2")
+
+    def test_rejects_bad_hours(self):
+        for hours in ("0", "-1", "nan", "inf"):
+            self.assert_rejected(f"Catan {hours} points ann=10 bob=7", "finite number more than 0")
+
+    def test_rejects_non_finite_scores(self):
+        for score in ("nan", "inf", "-inf"):
+            self.assert_rejected(f"Catan 2 points ann={score} bob=7", "isn't a finite number")
+
+    def test_rejects_unknown_players_and_games(self):
+        self.assert_rejected("Catan 2 points zed=10", "matches nobody")
+        self.assert_rejected("Catan ann=10", "hasn't been played yet")
@@ -0,0 +1,57 @@
+from http import HTTPStatus
+
+from gametournament.server import HTTPError, post_scores
+from tests.support import TournamentTestCase
+
+
+class PostScoresTest(TournamentTestCase):
+    def post(self, type_: str = "points", hours: object = 2, results: list[tuple[str, object]] = None) -> dict:
+        results = results or [("Ann", 10), ("Bob", 7), ("Cy", 3)]
+        body = {
+            "game": "Catan",
+            "hours": hours,
+            "type": type_,
+            "results": [{"player": player, "score": score} for player, score in results],
+        }
+        response = post_scores(self.connection, self.tournament, {}, body)
+        self.connection.commit()
+        return response
+
+    def assert_bad_request(self, message: str, **kwargs):
+        with self.assertRaisesRegex(HTTPError, message) as raised:
+            self.post(**kwargs)
+        self.assertEqual(raised.exception.status, HTTPStatus.BAD_REQUEST)
+        self.connection.rollback()
+        self.assertEqual(self.score_count(), 0)
+
+    def test_records_a_game(self):
+        response = self.post()
+        self.assertEqual(len(response["scores"]), 3)
+        self.assertEqual(self.score_count(), 3)
+
+    def test_rejects_a_player_given_twice(self):
+        self.assert_bad_request("Ann has more than one result", results=[("Ann", 5), ("Ann", 3)])
+
+    def test_rejects_rank_beyond_the_player_count(self):
+        self.assert_bad_request("whole numbers from 1 to 2", type_="rank", results=[("Ann", 9), ("Bob", 1)])
+
+    def test_rejects_fractional_rank(self):
+        self.assert_bad_request("whole numbers from 1 to 2", type_="rank", results=[("Ann", 1.5), ("Bob", 1)])
+
+    def test_rejects_zero_hours(self):
+        self.assert_bad_request("hours must be a finite number more than 0", hours=0)
+
+    def test_rejects_negative_hours(self):
+        self.assert_bad_request("hours must be a finite number more than 0", hours=-1)
+
+    def test_rejects_nan_hours(self):
+        self.assert_bad_request("hours must be a finite number more than 0", hours="nan")
+
+    def test_rejects_infinite_hours(self):
+        self.assert_bad_request("hours must be a finite number more than 0", hours="inf")
+
+    def test_rejects_nan_score(self):
+        self.assert_bad_request("needs a finite score", results=[("Ann", 10), ("Bob", "nan")])
+
+    def test_rejects_infinite_score(self):
+        self.assert_bad_request("needs a finite score", results=[("Ann", float("inf")), ("Bob", 7)])